@@ -0,0 +1,108 @@
+import html
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><title>{city} for sale "{query}" - craigslist</title></head>
+<body>
+<div class="cl-count-save-bar"><span class="cl-page-number">{first} - {last}</span></div>
+<ol class="cl-static-search-results">
+  <li class="cl-static-hub-links">see also</li>
+{listings}
+</ol>
+</body>
+</html>
+"""
+
+LISTING_TEMPLATE = """  <li class="cl-static-search-result" title="{title}">
+    <a href="{base}/{city}/sss/d/{slug}/{pid}.html">
+      <div class="title">{title}</div>
+      <div class="details">
+        <div class="price">${price:,}</div>
+        <div class="location">{city}</div>
+      </div>
+    </a>
+  </li>"""
+
+class FakeCraigslist:
+    """Local stand-in for Craigslist search pages, in the static (no-JavaScript) result markup
+
+    Serves /<city>/search[/<area>]/sss?query=...&s=<offset>, newest postings first.
+    Each query gains `new_per_request` postings every time its first page is
+    requested, so repeated sweeps see a steady trickle of new listings. Prices
+    are derived from the posting ID, so runs are reproducible.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, page_size=120, new_per_request=3, first_id=7800000000):
+        self.page_size = page_size
+        self.new_per_request = new_per_request
+        self.first_id = first_id
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._newest = {}  # (city, query) -> newest posting ID
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def page(self, city, query, offset):
+        """HTML of one result page"""
+        with self._lock:
+            self.requests += 1
+            key = (city, query)
+            newest = self._newest.get(key, self.first_id + len(self._newest) * 100000)
+            if offset == 0:
+                newest += self.new_per_request
+            self._newest[key] = newest
+
+        slug = "-".join(query.split()) or "item"
+        listings = []
+        for pid in range(newest - offset, newest - offset - self.page_size, -1):
+            title = html.escape(f"{query} #{pid % 100000}")
+            listings.append(LISTING_TEMPLATE.format(
+                base=self.base_url, city=city, slug=slug, pid=pid, title=title, price=(pid * 37) % 2000 + 5
+            ))
+        return PAGE_TEMPLATE.format(city=city, query=html.escape(query), first=offset + 1,
+                                    last=offset + self.page_size, listings="\n".join(listings))
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                # /<city>/search/sss, or /<city>/search/<area>/sss for a sub-area
+                if len(parts) not in (3, 4) or parts[1] != "search" or parts[-1] != "sss":
+                    self.send_error(404)
+                    return
+                params = parse_qs(url.query)
+                body = server.page(parts[0], params.get("query", [""])[0], int(params.get("s", ["0"])[0])).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="fake-craigslist", daemon=True).start()
+        return self
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
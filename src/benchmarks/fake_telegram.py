@@ -0,0 +1,95 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+class FakeTelegram:
+    """Local stand-in for the Telegram Bot API
+
+    Accepts any /bot<token>/<method> call. sendMessage calls are recorded as
+    (received_at, chat_id, text) and every `rate_limit_every`-th one is
+    refused with a 429 and `retry_after` seconds, like Telegram's flood
+    control. getUpdates returns no updates.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, rate_limit_every=500, retry_after=1):
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.sends = []
+        self.rate_limited = 0
+        self._attempts = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def api_base(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset(self):
+        """Forget recorded sends, returning the ones recorded so far"""
+        with self._lock:
+            sends, self.sends = self.sends, []
+            self.rate_limited = 0
+            return sends
+
+    def handle(self, method, params):
+        """Returns (status, response body) for one API call"""
+        if method == "getUpdates":
+            time.sleep(min(float(params.get("timeout", 0)), 1))
+            return 200, {"ok": True, "result": []}
+        if method != "sendMessage":
+            return 200, {"ok": True, "result": True}
+
+        with self._lock:
+            self._attempts += 1
+            if self.rate_limit_every and self._attempts % self.rate_limit_every == 0:
+                self.rate_limited += 1
+                return 429, {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                             "parameters": {"retry_after": self.retry_after}}
+            self.sends.append((time.time(), params.get("chat_id"), params.get("text", "")))
+            message_id = len(self.sends)
+        return 200, {"ok": True, "result": {"message_id": message_id, "chat": {"id": params.get("chat_id")}}}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self, params):
+                method = self.path.split("?")[0].rstrip("/").rsplit("/", 1)[-1]
+                status, response = server.handle(method, params)
+                body = json.dumps(response).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = parse_qs(self.rfile.read(length).decode("utf-8"))
+                self._respond({key: values[0] for key, values in form.items()})
+
+            def do_GET(self):
+                query = self.path.split("?", 1)[1] if "?" in self.path else ""
+                self._respond({key: values[0] for key, values in parse_qs(query).items()})
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="fake-telegram", daemon=True).start()
+        return self
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
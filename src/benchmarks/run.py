@@ -0,0 +1,272 @@
+"""Benchmark the scrape-and-notify path against local fake servers.
+
+Run from src/:
+    python -m benchmarks.run                          # 10, 100, 1000 and 10000 users
+    python -m benchmarks.run --users 10 100 --save-baseline
+    python -m benchmarks.run --users 10 100           # compare against the saved baseline
+
+A fake Craigslist serves generated result pages and a fake Telegram Bot API
+records every message (refusing some with 429s). For each filter-set size a
+fresh bot process gets synthetic filters in its own data directory. It then
+runs `_search_all_filters` several times: one cold sweep with no high-water
+marks, then warm sweeps that only see new postings. The report covers query
+throughput, p50/p99 latency from sweep start to each message reaching
+Telegram, messages per second, 429s, and the process's peak RSS.
+
+With --scrape-workers N the bot runs with SEARCH_EXECUTION=queue and N
+scrape worker processes do the fetching and parsing.
+
+Exits with status 1 if any metric regresses past --tolerance against the
+baseline file.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ITEMS = [
+    "ps5", "iphone", "bike", "couch", "macbook", "nintendo switch", "desk", "guitar", "tv", "camera",
+    "kayak", "drone", "road bike", "standing desk", "xbox", "ipad", "monitor", "dresser", "snowboard", "piano",
+    "gta 5", "lego", "treadmill", "air fryer", "espresso machine", "golf clubs", "tent", "sofa", "bookshelf", "drum kit",
+]
+LOCATIONS = ["New York", "San Francisco", "Chicago", "San Diego"]
+PRICES = ["", "100", "250", "500", "1000", "2000"]
+
+def synthetic_filters(users, filters_per_user, seed=0):
+    """{user_id: [filter, ...]} with popular items shared across many users, as in real use"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(ITEMS))]
+    filters = {}
+    for user in range(users):
+        filters[str(100000 + user)] = [
+            {"item": rng.choices(ITEMS, weights)[0], "location": rng.choice(LOCATIONS), "price": rng.choice(PRICES)}
+            for _ in range(filters_per_user)
+        ]
+    return filters
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_worker(args):
+    """Child process: load the filters, run the sweeps and print one JSON line of timings"""
+    from storage.backends import create_filter_store
+    from services.filter_service import FilterService
+    from services.query_planner import plan_queries
+    from messaging.telegram import TelegramMessenger
+    from bot.telegram_bot import TelegramBot
+
+    logging.getLogger().setLevel(args.log_level)
+
+    filters = synthetic_filters(args.users[0], args.filters_per_user, args.seed)
+    store = create_filter_store()
+    if isinstance(store, FilterService):
+        store.save_filters(filters)
+    else:
+        for user_id, user_filters in filters.items():
+            store.add_filters(user_id, user_filters)
+
+    messenger = TelegramMessenger("benchmark-token")
+    bot = TelegramBot(messenger, store)
+    queries = len(plan_queries(bot._collect_filters()))
+
+    sweeps = []
+    for _ in range(args.sweeps):
+        start = time.time()
+        bot._search_all_filters()
+        scraped = time.time()
+        messenger.flush()
+        sweeps.append({"start": start, "scraped": scraped, "end": time.time()})
+
+    print(json.dumps({"queries": queries, "sweeps": sweeps, "peak_rss_mb": peak_rss_mb()}))
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def summarize(windows, sends, queries):
+    """Throughput and latency over a group of sweeps, from their time windows and the recorded sends"""
+    latencies = []
+    for window in windows:
+        latencies.extend(sent_at - window["start"] for sent_at, _, _ in sends if window["start"] <= sent_at <= window["end"])
+    sweep_seconds = sum(window["scraped"] - window["start"] for window in windows) / len(windows)
+    total_seconds = sum(window["end"] - window["start"] for window in windows) / len(windows)
+    return {
+        "sweep_seconds": round(sweep_seconds, 3),
+        "queries_per_second": round(queries / sweep_seconds, 1) if sweep_seconds else None,
+        "messages": len(latencies),
+        "messages_per_second": round(len(latencies) / len(windows) / total_seconds, 1) if total_seconds else None,
+        "p50_latency": round(percentile(latencies, 0.5), 3) if latencies else None,
+        "p99_latency": round(percentile(latencies, 0.99), 3) if latencies else None,
+    }
+
+def run_size(users, args, craigslist, telegram):
+    """Run one filter-set size in a fresh process and return its report"""
+    with tempfile.TemporaryDirectory(prefix="bench-") as data_dir:
+        env = dict(
+            os.environ,
+            PYTHONPATH=SRC_DIR,
+            DATA_DIR=data_dir,
+            CRAIGSLIST_BASE_URL=craigslist.base_url + "/{city}",
+            TELEGRAM_API_BASE=telegram.api_base,
+            SCRAPE_BACKEND="http",
+            STORAGE_BACKEND=args.storage,
+            MIN_HOST_INTERVAL="0",  # Every fake city shares one host; politeness delays would only measure sleep
+            SEARCH_PER_HOST_LIMIT=str(args.workers),
+            SEARCH_MAX_WORKERS=str(args.workers),
+            TELEGRAM_GLOBAL_RATE=str(args.telegram_rate),
+            METRICS_PORT="0",
+        )
+        command = [sys.executable, "-m", "benchmarks.run", "--worker", "--users", str(users),
+                   "--filters-per-user", str(args.filters_per_user), "--sweeps", str(args.sweeps),
+                   "--seed", str(args.seed), "--log-level", args.log_level]
+        scrape_workers = None
+        if args.scrape_workers:
+            # Scraping moves to separate worker processes sharing the job queue in data_dir
+            env["SEARCH_EXECUTION"] = "queue"
+            scrape_workers = subprocess.Popen(
+                [sys.executable, "-m", "scrapers.worker", "--processes", str(args.scrape_workers)],
+                cwd=data_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        telegram.reset()
+        try:
+            completed = subprocess.run(command, cwd=data_dir, env=env, capture_output=True, text=True)
+        finally:
+            if scrape_workers:
+                scrape_workers.terminate()
+                scrape_workers.wait()
+        rate_limited = telegram.rate_limited
+        sends = telegram.reset()
+        if completed.returncode != 0:
+            raise RuntimeError(f"Benchmark worker for {users} users failed:\n{completed.stderr[-4000:]}")
+        worker = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    sweeps = worker["sweeps"]
+    report = {
+        "users": users,
+        "filters": users * args.filters_per_user,
+        "queries": worker["queries"],
+        "rate_limited": rate_limited,
+        "peak_rss_mb": round(worker["peak_rss_mb"], 1),
+        "cold": summarize(sweeps[:1], sends, worker["queries"]),
+    }
+    if len(sweeps) > 1:
+        report["warm"] = summarize(sweeps[1:], sends, worker["queries"])
+    return report
+
+# (metric path, True if bigger is better)
+COMPARED = [
+    (("cold", "queries_per_second"), True),
+    (("warm", "queries_per_second"), True),
+    (("cold", "p99_latency"), False),
+    (("warm", "p99_latency"), False),
+    (("peak_rss_mb",), False),
+]
+
+def _lookup(report, path):
+    for key in path:
+        if not isinstance(report, dict) or key not in report:
+            return None
+        report = report[key]
+    return report
+
+def compare(reports, baseline, tolerance):
+    """Descriptions of every metric that is more than `tolerance` worse than the baseline"""
+    regressions = []
+    for report in reports:
+        base = baseline.get(str(report["users"]))
+        if not base:
+            continue
+        for path, higher_is_better in COMPARED:
+            current, previous = _lookup(report, path), _lookup(base, path)
+            if current is None or not previous:
+                continue
+            worse = current < previous * (1 - tolerance) if higher_is_better else current > previous * (1 + tolerance)
+            if worse:
+                regressions.append(f"{report['users']} users: {'.'.join(path)} {current} vs baseline {previous}")
+    return regressions
+
+def print_table(reports):
+    header = f"{'users':>7} {'queries':>7} {'sweep':>5} {'q/s':>8} {'msgs':>7} {'msg/s':>8} {'p50 s':>7} {'p99 s':>7} {'429s':>5} {'rss MB':>7}"
+    print(header)
+    print("-" * len(header))
+    for report in reports:
+        for sweep in ("cold", "warm"):
+            phase = report.get(sweep)
+            if not phase:
+                continue
+            print(f"{report['users']:>7} {report['queries']:>7} {sweep:>5} {phase['queries_per_second'] or 0:>8} "
+                  f"{phase['messages']:>7} {phase['messages_per_second'] or 0:>8} {phase['p50_latency'] or 0:>7} "
+                  f"{phase['p99_latency'] or 0:>7} {report['rate_limited']:>5} {report['peak_rss_mb']:>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sweeps against a fake Craigslist and Telegram")
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--filters-per-user", type=int, default=2)
+    parser.add_argument("--sweeps", type=int, default=3, help="One cold sweep, then warm ones")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent searches")
+    parser.add_argument("--storage", choices=["files", "sqlite"], default="files")
+    parser.add_argument("--scrape-workers", type=int, default=0,
+                        help="Scrape in this many worker processes through the job queue (0: in the bot process)")
+    parser.add_argument("--telegram-rate", type=float, default=1000, help="Global send rate limit (messages/s)")
+    parser.add_argument("--rate-limit-every", type=int, default=500, help="Refuse every Nth send with a 429 (0: never)")
+    parser.add_argument("--new-per-sweep", type=int, default=3, help="New postings per query per sweep")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="Record these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed fractional regression")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    from benchmarks.fake_craigslist import FakeCraigslist
+    from benchmarks.fake_telegram import FakeTelegram
+
+    craigslist = FakeCraigslist(new_per_request=args.new_per_sweep).start()
+    telegram = FakeTelegram(rate_limit_every=args.rate_limit_every).start()
+    try:
+        reports = []
+        for users in args.users:
+            print(f"Running {users} users...", file=sys.stderr)
+            reports.append(run_size(users, args, craigslist, telegram))
+    finally:
+        craigslist.shutdown()
+        telegram.shutdown()
+
+    print_table(reports)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    if args.save_baseline:
+        baseline.update({str(report["users"]): report for report in reports})
+        with open(args.baseline, "w") as file:
+            json.dump(baseline, file, indent=4, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    regressions = compare(reports, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if baseline and not regressions:
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency, only needed for RUNTIME=asyncio
+    aiohttp = None
+
+from constants.constants import (
+    SEARCH_SYNC_SECONDS, SEARCH_MAX_WORKERS, SEARCH_PER_HOST_LIMIT, HTTP_POOL_SIZE, HTTP_TIMEOUT
+)
+from scrapers import craigslist, http_fetcher
+from services.query_planner import plan_queries, QUERY_SECONDS
+from services.results_sink import get_results_sink
+
+logger = logging.getLogger(__name__)
+
+class AsyncBotRuntime:
+    """Runs a bot on a single asyncio event loop
+
+    Update polling, query scheduling, digest flushing and every scrape are
+    tasks on one loop. Concurrency is bounded by semaphores rather than by one
+    thread per in-flight search; only blocking work (parsing, Selenium,
+    storage writes, the bot's handlers) is pushed to the default executor.
+    """
+
+    def __init__(self, bot):
+        if aiohttp is None:
+            raise RuntimeError("The asyncio runtime needs aiohttp: pip install aiohttp")
+        self.bot = bot
+        self.messenger = bot.messenger
+        self.loop = None
+        self.http = None
+        bot.async_runtime = self
+
+    def run(self):
+        """Run the bot until interrupted"""
+        asyncio.run(self._main())
+
+    def submit(self, coro):
+        """Schedule a coroutine on the runtime's loop from any thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def _main(self):
+        self.loop = asyncio.get_running_loop()
+        self.search_slots = asyncio.Semaphore(SEARCH_MAX_WORKERS)
+        self.host_slots = {}
+        self.http = aiohttp.ClientSession(
+            headers=http_fetcher.HEADERS,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+            connector=aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, keepalive_timeout=60)
+        )
+        await self.messenger.start()
+        self.messenger.set_handlers(self.bot.handle_message, self.bot.handle_callback)
+        logger.info("Async runtime started")
+        try:
+            await asyncio.gather(
+                self.messenger.poll_forever(),
+                self._poll_queries(),
+                self._every(60, lambda: asyncio.to_thread(self.bot.digest.flush_due)),
+                self._every(86400, lambda: asyncio.to_thread(get_results_sink().compact)),
+            )
+        finally:
+            await self.messenger.close()
+            await self.http.close()
+
+    async def _every(self, seconds, job):
+        """Run `job()` every `seconds`, starting one interval from now"""
+        while True:
+            await asyncio.sleep(seconds)
+            try:
+                await job()
+            except Exception as e:
+                logger.error(f"Error in scheduled job: {e}", exc_info=True)
+
+    async def _poll_queries(self):
+        """Start each query as the bot's poll scheduler says it is due"""
+        scheduler = self.bot.poll_scheduler
+        synced_at = None
+        while True:
+            if synced_at is None or self.loop.time() - synced_at >= SEARCH_SYNC_SECONDS:
+                await asyncio.to_thread(self.bot._sync_queries)
+                synced_at = self.loop.time()
+            for plan in scheduler.pop_due():
+                self.loop.create_task(self._run_scheduled(plan))
+            await asyncio.sleep(1)
+
+    async def _run_scheduled(self, plan):
+        try:
+            self.bot._deliver_plan(plan, await self._run_plan(plan))
+        except Exception as e:
+            logger.error(f"Search failed for {plan}: {e}", exc_info=True)
+        finally:
+            self.bot.poll_scheduler.complete(plan)
+
+    def _host_slot(self, host):
+        if host not in self.host_slots:
+            self.host_slots[host] = asyncio.Semaphore(SEARCH_PER_HOST_LIMIT)
+        return self.host_slots[host]
+
+    async def _run_plan(self, plan):
+        """Scrape one query within the global and per-subdomain limits"""
+        async with self._host_slot(plan.host), self.search_slots:
+            with QUERY_SECONDS.time():
+                stop_at = await asyncio.to_thread(plan.stop_at)
+                listings = await craigslist.fetch_listings_async(self.http, plan.url, stop_at=stop_at)
+        return await asyncio.to_thread(plan.fan_out, listings)
+
+    async def _run_plans(self, plans):
+        """Run every plan concurrently, yielding fan-outs as each finishes"""
+        tasks = [asyncio.ensure_future(self._run_plan(plan)) for plan in plans]
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                yield await next_done
+            except Exception as e:
+                logger.error(f"Search failed: {e}", exc_info=True)
+
+    async def search_for_user(self, chat_id):
+        """Async counterpart of BaseBot._search_for_user's search thread"""
+        chat_id_str = str(chat_id)
+        self.bot._set_searching(chat_id, True)
+        logger.info(f"Starting immediate search for user {chat_id_str}")
+        try:
+            filters = await asyncio.to_thread(self.bot.filter_service.get_user_filters, chat_id_str)
+            found = []
+            async for fanned_out in self._run_plans(plan_queries({chat_id_str: filters}, incremental=False)):
+                for _, _, results in fanned_out:
+                    found.extend(results)
+            self.bot._deliver_user_search(chat_id, found)
+        except Exception as e:
+            logger.error(f"Error in immediate search for user {chat_id_str}: {str(e)}", exc_info=True)
+            self.messenger.send_message(
+                chat_id,
+                f"Your filter has been saved, but there was an error running the search: {str(e)}"
+            )
+        finally:
+            self.bot._set_searching(chat_id, False)
+            logger.info(f"Completed immediate search for user {chat_id_str}")
@@ -1,11 +1,18 @@
 from abc import ABC, abstractmethod
-from threading import Thread
+from threading import Thread, Lock
 import time
 from enum import Enum
 import logging
 import schedule
 
-from scrapers import craigslist
+from services.search_executor import create_search_executor
+from services.poll_scheduler import PollScheduler
+from services.query_planner import plan_queries
+from services.results_sink import get_results_sink
+from services.settings_service import SettingsService
+from services.digest import DigestService
+from storage.backends import create_session_store, create_digest_store
+from constants.constants import SETTINGS_FILE, SEARCH_SYNC_SECONDS, WEBHOOK_URL, WEBHOOK_LISTEN_HOST, WEBHOOK_LISTEN_PORT, WEBHOOK_SECRET
 
 logging.basicConfig(
     level=logging.INFO,
@@ -41,15 +48,37 @@ class BaseBot(ABC):
     
     def __init__(self, messenger):
         self.messenger = messenger
-        self.user_data = {}  # Store user session data
+        self.user_data = create_session_store(FilterState)  # Conversation state per chat, persisted across restarts
+        self.search_executor = create_search_executor()
+        self.poll_scheduler = PollScheduler()
+        self.digest = DigestService(messenger, SettingsService(SETTINGS_FILE), create_digest_store())
+        self.is_searching = set()  # Chats with an immediate search running (not persisted: a restart ends them)
+        self._searching_lock = Lock()
+        self.async_runtime = None  # Set when running under bot.async_runtime.AsyncBotRuntime
     
-    def run(self):
-        """Main loop for bot operation"""
+    def run(self, on_ready=None):
+        """Main loop for bot operation; `on_ready()` is called once the bot is about to take updates"""
         self.messenger.set_handlers(self.handle_message, self.handle_callback)
+        self._start_background_search()
         
+        if WEBHOOK_URL:
+            if on_ready:
+                on_ready()
+            self.messenger.serve_webhook(WEBHOOK_URL, WEBHOOK_LISTEN_HOST, WEBHOOK_LISTEN_PORT, WEBHOOK_SECRET)
+            return
+        
+        # getUpdates is refused while a webhook is registered
+        self.messenger.delete_webhook()
+        if on_ready:
+            on_ready()
         while True:
-            self.messenger.get_updates()
-            time.sleep(1)
+            try:
+                # Long polling: returns as soon as an update arrives
+                self.messenger.get_updates()
+            except Exception as e:
+                logger.error(f"Error fetching updates: {str(e)}", exc_info=True)
+                # Honor the platform's retry_after (e.g. Telegram's flood control) when it gives one
+                time.sleep(getattr(e, "retry_after", None) or 5)
     
     @abstractmethod
     def handle_message(self, message):
@@ -68,68 +97,120 @@ class BaseBot(ABC):
         logger.info("Background search thread started")
 
     def _run_periodic_search(self):
-        """Run periodic search every 10 minutes"""
-        # Schedule the job to run every 10 minutes
-        schedule.every(10).minutes.do(self._search_all_filters)
-        logger.info("Scheduled periodic search every 10 minutes")
+        """Run each query as it comes due, plus digests and compaction on a fixed schedule"""
+        # Pick up added and deleted filters
+        self._sync_queries()
+        schedule.every(SEARCH_SYNC_SECONDS).seconds.do(self._sync_queries)
+        
+        # Send scheduled digests as they come due
+        schedule.every(1).minutes.do(self.digest.flush_due)
+        
+        # Drop old entries from the results log once a day
+        schedule.every().day.do(get_results_sink().compact)
         
         # Keep the scheduler running
         while True:
+            for plan in self.poll_scheduler.pop_due():
+                self.search_executor.submit(plan, self._deliver_plan, self.poll_scheduler.complete)
             schedule.run_pending()
             time.sleep(1)
     
+    def _sync_queries(self):
+        """Hand the current set of distinct queries to the poll scheduler"""
+        try:
+            self.poll_scheduler.sync(plan_queries(self._collect_filters(skip_searching=False)))
+        except Exception as e:
+            logger.error(f"Error loading filters for the poll scheduler: {str(e)}", exc_info=True)
+    
+    def _collect_filters(self, skip_searching=True):
+        """Filters of every user (by default, those not already being searched), as {user_id: [filter, ...]}"""
+        all_users = self.filter_service.get_all_users()
+        logger.info(f"Found {len(all_users)} users with filters")
+        
+        filters_by_user = {}
+        for user_id in all_users:
+            # Skip if user is currently being searched in confirm_filter
+            if skip_searching and self._is_searching(int(user_id)):
+                logger.info(f"Skipping user {user_id} - already being searched")
+                continue
+            filters_by_user[user_id] = self.filter_service.get_user_filters(user_id)
+        return filters_by_user
+    
+    def _notify_results(self, fanned_out):
+        """Deliver one finished query's new listings to each of its subscribers"""
+        for user_id, search_params, results in fanned_out:
+            if not results:
+                logger.info(f"No results found for user {user_id} ({search_params['item']})")
+                continue
+            
+            logger.info(f"Found {len(results)} results for user {user_id}")
+            self.digest.deliver(int(user_id), results, "New listings matching your filters:")
+    
+    def _deliver_plan(self, plan, fanned_out):
+        """Deliver a scheduled query's results, then move its high-water mark past them"""
+        self._notify_results(fanned_out)
+        plan.advance_watermark()
+    
     def _search_all_filters(self):
-        """Search for all users' filters"""
+        """Search every user's filters once, now (the poll scheduler handles routine polling)"""
         try:
             logger.info("Starting periodic search for all users")
             
-            # Get all users with filters
-            all_users = self.filter_service.get_all_users()
-            logger.info(f"Found {len(all_users)} users with filters")
+            # Identical searches across users are scraped once and fanned out
+            plans = plan_queries(self._collect_filters())
             
-            for user_id in all_users:
-                # Skip if user is currently being searched in confirm_filter
-                chat_id = int(user_id)
-                if chat_id in self.is_searching and self.is_searching[chat_id]:
-                    logger.info(f"Skipping user {user_id} - already being searched")
-                    continue
-                
-                logger.info(f"Searching for user {user_id}")
-                results = craigslist.main(user_id)
-                
-                if results:
-                    logger.info(f"Found {len(results)} results for user {user_id}")
-                    self.messenger.send_message(chat_id, "New listings matching your filters:")
-                    for result in results:
-                        self.messenger.send_message(chat_id, f"{result['title']}\n{result['price']}\n{result['link']}")
-                else:
-                    logger.info(f"No results found for user {user_id}")
+            # Results are streamed to users as each search finishes
+            self.search_executor.run(plans, self._deliver_plan)
             
             logger.info("Completed periodic search for all users")
         except Exception as e:
             logger.error(f"Error in periodic search: {str(e)}", exc_info=True)
     
+    def _is_searching(self, chat_id):
+        with self._searching_lock:
+            return chat_id in self.is_searching
+    
+    def _set_searching(self, chat_id, searching):
+        with self._searching_lock:
+            if searching:
+                self.is_searching.add(chat_id)
+            else:
+                self.is_searching.discard(chat_id)
+    
+    def _deliver_user_search(self, chat_id, found):
+        """Send the outcome of an immediate search to the user who is waiting on it"""
+        if found:
+            logger.info(f"Found {len(found)} results for user {chat_id}")
+            # The user is waiting on this search, so it bypasses any digest schedule
+            self.digest.send_now(chat_id, found, "Here are current listings matching your filter:")
+        else:
+            logger.info(f"No results found for user {chat_id}")
+            self.messenger.send_message(
+                chat_id,
+                "No listings found matching your filter currently. You'll be notified when items appear."
+            )
+    
     def _search_for_user(self, chat_id):
         """Run an immediate search for a specific user in a separate thread"""
+        if self.async_runtime:
+            self.async_runtime.submit(self.async_runtime.search_for_user(chat_id))
+            return
+        
         def search_thread_func():
             chat_id_str = str(chat_id)
-            self.is_searching[chat_id] = True
+            self._set_searching(chat_id, True)
             logger.info(f"Starting immediate search for user {chat_id_str}")
             
             try:
-                results = craigslist.main(chat_id_str)
+                plans = plan_queries({chat_id_str: self.filter_service.get_user_filters(chat_id_str)}, incremental=False)
+                found = []
+                
+                def notify(plan, fanned_out):
+                    for _, _, results in fanned_out:
+                        found.extend(results)
                 
-                if results:
-                    logger.info(f"Found {len(results)} results for user {chat_id_str}")
-                    self.messenger.send_message(chat_id, "Here are current listings matching your filter:")
-                    for result in results:
-                        self.messenger.send_message(chat_id, f"{result['title']}\n{result['price']}\n{result['link']}")
-                else:
-                    logger.info(f"No results found for user {chat_id_str}")
-                    self.messenger.send_message(
-                        chat_id,
-                        "No listings found matching your filter currently. You'll be notified when items appear."
-                    )
+                self.search_executor.run(plans, notify)
+                self._deliver_user_search(chat_id, found)
             except Exception as e:
                 logger.error(f"Error in immediate search for user {chat_id_str}: {str(e)}", exc_info=True)
                 self.messenger.send_message(
@@ -138,7 +219,7 @@ class BaseBot(ABC):
                 )
             finally:
                 # Clear search status
-                self.is_searching[chat_id] = False
+                self._set_searching(chat_id, False)
                 logger.info(f"Completed immediate search for user {chat_id_str}")
         
         # Start search in a new thread
@@ -1,6 +1,7 @@
 import logging
 
 from constants.constants import LOCATIONS
+from scrapers.sites import resolve_location, UnknownLocationError
 from .base import BaseBot, FilterState
 
 # Set up logging
@@ -14,20 +15,39 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def format_filter(filter_data):
+    """Human-readable summary of a saved filter"""
+    price = filter_data.get('price') or "any"
+    if filter_data.get('min_price'):
+        price = f"{filter_data['min_price']}-{filter_data.get('price') or ''}"
+    lines = [f"Item: {filter_data['item']}", f"Price: {price}", f"Location: {filter_data['location']}"]
+    if filter_data.get('include'):
+        lines.append(f"Must include: {', '.join(filter_data['include'])}")
+    if filter_data.get('exclude'):
+        lines.append(f"Excluding: {', '.join(filter_data['exclude'])}")
+    return "\n".join(lines)
+
 class TelegramBot(BaseBot):
     """Bot for managing item filters"""    
     def __init__(self, messenger, filter_service):
         super().__init__(messenger)
         self.filter_service = filter_service
-        self.is_searching = {}  # Track search status per user
         logger.info("TelegramBot initialized")
         
     def handle_message(self, update):
         """Handle incoming messages"""
         chat_id = update["message"]["chat"]["id"]
         text = update["message"].get("text", "")
-        print(f"Got message: {text}")
+        logger.debug(f"Got message from {chat_id}: {text}")
 
+        try:
+            self.handle_text(chat_id, text)
+        finally:
+            # Handlers change the session in place; persist what they left behind
+            self.user_data.save(chat_id)
+    
+    def handle_text(self, chat_id, text):
+        """Route a message to a command or to the current step of the chat's conversation"""
         # Command handling
         if text == "/start":
             self.send_welcome(chat_id)
@@ -41,6 +61,8 @@ class TelegramBot(BaseBot):
             self.delete_filter(chat_id)
         elif text == "/update":
             self.update_filter(chat_id)
+        elif text.startswith("/digest"):
+            self.set_digest(chat_id, text[len("/digest"):].strip())
         elif text.lower() == "confirm" and chat_id in self.user_data:
             self.confirm_filter(chat_id)
         elif text.lower() == "edit" and chat_id in self.user_data:
@@ -58,11 +80,16 @@ class TelegramBot(BaseBot):
         chat_id = callback_query["message"]["chat"]["id"]
         callback_data = callback_query["data"]
         
-        if callback_data.startswith("location_") and chat_id in self.user_data:
+        if callback_data.startswith("digest_more_"):
+            self.digest.send_more(chat_id, callback_data[len("digest_more_"):])
+        elif callback_data.startswith("location_") and chat_id in self.user_data:
             location = callback_data[len("location_"):]
-            self.user_data[chat_id]["filters"][-1]["location"] = location
-            self.messenger.send_message(chat_id, f"You selected {location}. Let's proceed!")
-            self.ask_confirmation(chat_id)
+            try:
+                self.user_data[chat_id]["filters"][-1]["location"] = location
+                self.messenger.send_message(chat_id, f"You selected {location}. Let's proceed!")
+                self.ask_confirmation(chat_id)
+            finally:
+                self.user_data.save(chat_id)
     
     def process_state_input(self, chat_id, text):
         """Process user input based on the current state"""
@@ -75,8 +102,7 @@ class TelegramBot(BaseBot):
             self.user_data[chat_id]["filters"][-1]["price"] = text
             self.ask_location(chat_id)
         elif state == FilterState.LOCATION:
-            self.user_data[chat_id]["filters"][-1]["location"] = text
-            self.ask_confirmation(chat_id)
+            self.set_location(chat_id, text)
         elif state == FilterState.EDIT_ITEM:
             self.user_data[chat_id]["filters"][-1]["item"] = text
             self.ask_confirmation(chat_id)
@@ -84,8 +110,17 @@ class TelegramBot(BaseBot):
             self.user_data[chat_id]["filters"][-1]["price"] = text
             self.ask_confirmation(chat_id)
         elif state == FilterState.EDIT_LOCATION:
-            self.user_data[chat_id]["filters"][-1]["location"] = text
-            self.ask_confirmation(chat_id)
+            self.set_location(chat_id, text)
+    
+    def set_location(self, chat_id, text):
+        """Store a typed location under its catalog name, or ask again if no Craigslist site matches"""
+        try:
+            location = resolve_location(text)
+        except UnknownLocationError:
+            self.messenger.send_message(chat_id, f"I couldn't find a Craigslist site for \"{text}\". Try a nearby city.")
+            return
+        self.user_data[chat_id]["filters"][-1]["location"] = location.name
+        self.ask_confirmation(chat_id)
     
     def send_welcome(self, chat_id):
         """Send welcome message"""
@@ -103,6 +138,7 @@ class TelegramBot(BaseBot):
             "/view - View all your saved filters\n"
             "/delete - Delete a specific filter\n"
             "/update - Update an existing filter\n"
+            "/digest <minutes> - Get new listings bundled every N minutes (/digest off for immediate)\n"
         )
         self.messenger.send_message(chat_id, help_message)
     
@@ -111,12 +147,15 @@ class TelegramBot(BaseBot):
         if chat_id not in self.user_data:
             self.user_data[chat_id] = {"state": FilterState.ITEM, "filters": []}
         self.user_data[chat_id]["state"] = FilterState.ITEM
-        self.messenger.send_message(chat_id, "What item are you looking for?")
+        self.messenger.send_message(
+            chat_id,
+            "What item are you looking for? Add +word to require a word in the title or -word to exclude one."
+        )
     
     def ask_price(self, chat_id):
         """Ask for price"""
         self.user_data[chat_id]["state"] = FilterState.PRICE
-        self.messenger.send_message(chat_id, "What price are you looking for?")
+        self.messenger.send_message(chat_id, "What price are you looking for? Send a maximum (500) or a range (100-500).")
     
     def ask_location(self, chat_id):
         """Ask for location"""
@@ -125,7 +164,7 @@ class TelegramBot(BaseBot):
             [{"text": location, "callback_data": f"location_{location}"}] 
             for location in LOCATIONS
         ]
-        self.messenger.send_buttons(chat_id, "Select a location:", location_buttons)
+        self.messenger.send_buttons(chat_id, "Select a location, or type any city or area:", location_buttons)
     
     def ask_confirmation(self, chat_id):
         """Ask for confirmation"""
@@ -184,7 +223,7 @@ class TelegramBot(BaseBot):
         
         filters_message = "Your saved filters:\n"
         for idx, filter_data in enumerate(filters):
-            filters_message += f"\nFilter {idx + 1}:\nItem: {filter_data['item']}\nPrice: {filter_data['price']}\nLocation: {filter_data['location']}\n"
+            filters_message += f"\nFilter {idx + 1}:\n{format_filter(filter_data)}\n"
         
         self.messenger.send_message(chat_id, filters_message)
         return filters
@@ -197,6 +236,19 @@ class TelegramBot(BaseBot):
             return
         self.user_data[chat_id] = {"state": FilterState.DELETE_FILTER}        
 
+    def set_digest(self, chat_id, argument):
+        """Choose immediate delivery or a digest every N minutes"""
+        if argument.lower() in ("off", "0"):
+            self.digest.set_interval(chat_id, 0)
+            self.messenger.send_message(chat_id, "New listings will be sent as soon as they're found.")
+        elif argument.isdigit():
+            self.digest.set_interval(chat_id, int(argument))
+            self.messenger.send_message(chat_id, f"New listings will be bundled into a digest every {int(argument)} minutes.")
+        else:
+            minutes = self.digest.get_interval(chat_id)
+            current = f"every {minutes} minutes" if minutes else "immediately"
+            self.messenger.send_message(chat_id, f"You currently get new listings {current}. Use /digest <minutes> or /digest off.")
+    
     def update_filter(self, chat_id):
         """Update a filter"""
         self.messenger.send_message(chat_id, "Update is not yet supported!")
@@ -212,7 +264,7 @@ class TelegramBot(BaseBot):
         
         filters_message = "Select the filter you want to edit:\n"
         for idx, filter_data in enumerate(filters):
-            filters_message += f"\nFilter {idx+1}:\nItem: {filter_data['item']}\nPrice: {filter_data['price']}\nLocation: {filter_data['location']}\n"
+            filters_message += f"\nFilter {idx+1}:\n{format_filter(filter_data)}\n"
         
         self.messenger.send_message(chat_id, filters_message)
         self.user_data[chat_id]["state"] = FilterState.EDIT_ITEM
\ No newline at end of file
@@ -1,8 +1,118 @@
 import os
 
 LOCATIONS = ["New York", "San Francisco", "Los Angeles", "Chicago", "Miami"]
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "resources"))
+RESOURCES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "resources"))
+BASE_DIR = os.path.abspath(os.getenv("DATA_DIR", RESOURCES_DIR))  # Filters, seen listings, results and settings
 FILTERS_FILE = os.path.join(BASE_DIR, "filters.json")
-RESULTS_FILE = os.path.join(BASE_DIR, "results.json")
-LINKS_FILE = os.path.join(BASE_DIR, "scraped_links.txt")
-os.makedirs(BASE_DIR, exist_ok=True)
\ No newline at end of file
+RESULTS_FILE = os.path.join(BASE_DIR, "results.json")  # Legacy, imported into RESULTS_LOG_FILE on first run
+RESULTS_LOG_FILE = os.path.join(BASE_DIR, "results.ndjson")
+RESULTS_MAX_AGE_DAYS = 90  # Compaction drops results older than this
+SETTINGS_FILE = os.path.join(BASE_DIR, "user_settings.json")
+LINKS_FILE = os.path.join(BASE_DIR, "scraped_links.txt")  # Legacy, imported into SEEN_DB_FILE on first run
+SEEN_DB_FILE = os.path.join(BASE_DIR, "seen.db")
+SEEN_TTL_DAYS = 30  # Forget delivered listings after this many days
+SESSION_DB_FILE = os.path.join(BASE_DIR, "sessions.db")  # In-progress /add, /edit and /delete conversations
+SESSION_TTL_HOURS = 24  # Conversations idle this long are abandoned
+SESSION_MAX_ENTRIES = 10000  # Conversations kept in memory; the rest are reloaded from SESSION_DB_FILE on demand
+os.makedirs(BASE_DIR, exist_ok=True)
+
+# Headless Chrome session pool
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "2"))
+DRIVER_MAX_PAGES = int(os.getenv("DRIVER_MAX_PAGES", "50"))  # Recycle a browser after this many pages
+DRIVER_ACQUIRE_TIMEOUT = 120  # Seconds to wait for a free session
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH", "")  # Use this chromedriver binary instead of resolving one
+DRIVER_PATH_CACHE_FILE = os.path.join(BASE_DIR, "chromedriver.json")  # Last resolved chromedriver binary
+DRIVER_PATH_MAX_AGE_DAYS = 7  # Re-resolve (hitting the network) after this long, to pick up Chrome updates
+
+# Scraping backend: "http" (plain requests), "selenium" (headless Chrome) or "auto" (HTTP with Selenium fallback)
+SCRAPE_BACKEND = os.getenv("SCRAPE_BACKEND", "auto")
+CRAIGSLIST_BASE_URL = os.getenv("CRAIGSLIST_BASE_URL", "https://{city}.craigslist.org")  # Point at a local fake server for benchmarks
+SITES_FILE = os.path.join(RESOURCES_DIR, "sites.json")  # Bundled catalog of Craigslist subdomains and sub-areas
+LOCATION_MATCH_CUTOFF = 0.8  # Similarity (0-1) a misspelled location needs to match a catalog entry
+HTTP_POOL_SIZE = 10
+HTTP_TIMEOUT = 15  # Seconds
+INCREMENTAL_MAX_PAGES = 3  # Pages fetched per query when a burst of new postings fills the first page
+INCREMENTAL_STOP_AFTER = 3  # Consecutive already-seen postings that end an incremental scrape (renewed posts sort near the top)
+
+# Per-subdomain circuit breaker
+HOST_FAILURE_THRESHOLD = 3  # Consecutive failed scrapes before a subdomain is left alone
+HOST_COOLDOWN = 60  # Seconds before the first probe; doubles after each failed probe
+HOST_MAX_COOLDOWN = 3600
+BLOCKED_STATUSES = (403, 429)
+BLOCK_MARKERS = (  # Lowercase text of Craigslist's block notice and of CAPTCHA challenge widgets
+    "this ip has been automatically blocked",
+    'class="h-captcha"',
+    'class="g-recaptcha"',
+)
+RESULTS_PAGE_MARKERS = ("cl-static-search-results", "cl-no-results")  # Present on a genuine search page, even one with no results
+
+# Listing parser: "selectolax", "lxml", "soup" (BeautifulSoup) or "auto" (fastest installed)
+LISTING_PARSER = os.getenv("LISTING_PARSER", "auto")
+FIXTURES_DIR = os.path.join(RESOURCES_DIR, "fixtures")  # Saved search pages with expected parser output
+
+# Readiness-based waits
+PAGE_READY_TIMEOUT = 10  # Seconds to wait for results to render before parsing anyway
+PAGE_READY_SELECTORS = (
+    "div.cl-search-result",  # First result card
+    ".cl-count-save-bar",  # Result-count marker, present even for empty searches
+    ".cl-no-results",
+)
+MIN_HOST_INTERVAL = float(os.getenv("MIN_HOST_INTERVAL", "1.0"))  # Minimum seconds between requests to the same Craigslist subdomain
+
+# Runtime: "threads" (polling loop, worker threads) or "asyncio" (single event loop, needs aiohttp)
+RUNTIME = os.getenv("RUNTIME", "threads")
+
+# Concurrent search executor
+SEARCH_INTERVAL_MINUTES = 10  # Starting poll interval of each query
+SEARCH_MIN_INTERVAL_MINUTES = 2  # Hottest queries are polled this often
+SEARCH_MAX_INTERVAL_MINUTES = 60  # Queries that never turn up anything new back off to this
+SEARCH_INTERVAL_BACKOFF = 1.5  # Interval multiplier after a run with nothing new (divisor after one with new listings)
+SEARCH_INTERVAL_JITTER = 0.1  # Fraction each interval is randomly stretched or shrunk by
+SEARCH_SYNC_SECONDS = 60  # How often the scheduler picks up added and deleted filters
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "8"))  # Searches in flight across all users
+SEARCH_PER_HOST_LIMIT = int(os.getenv("SEARCH_PER_HOST_LIMIT", "2"))  # Searches in flight per Craigslist subdomain
+
+# Scrape workers: SEARCH_EXECUTION "local" scrapes on the bot's own threads; "queue" hands each search to
+# worker processes (python -m scrapers.worker) through the SQLite job queue in JOB_QUEUE_FILE
+SEARCH_EXECUTION = os.getenv("SEARCH_EXECUTION", "local")
+JOB_QUEUE_FILE = os.path.abspath(os.getenv("JOB_QUEUE_FILE", os.path.join(BASE_DIR, "jobs.db")))  # Workers on other hosts need it on a shared disk
+JOB_LEASE_SECONDS = 300  # A worker that hasn't finished a job by then is presumed dead and the job is handed out again
+JOB_MAX_ATTEMPTS = 3  # Tries per job before it is reported as failed
+JOB_RETRY_DELAY = 30  # Seconds before a failed job is retried, multiplied by the attempt number
+JOB_MAX_WAIT = 900  # Seconds the bot waits for a job's result before giving up on it (e.g. no workers running)
+JOB_POLL_SECONDS = 0.5  # How often idle workers look for jobs and the bot looks for results
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", str(os.cpu_count() or 1)))  # Processes started by python -m scrapers.worker
+
+# Metrics and tracing: set METRICS_PORT to serve Prometheus metrics at http://METRICS_HOST:METRICS_PORT/metrics
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 disables the endpoint
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # Seconds
+TRACING = os.getenv("TRACING", "").lower() in ("1", "true", "yes")  # Log a span per pipeline stage
+
+# Storage backend: "files" (filters.json, seen.db, results.ndjson) or "sqlite" (everything in STORAGE_DB_FILE)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "files")
+STORAGE_DB_FILE = os.path.join(BASE_DIR, "storage.db")
+
+# Telegram Bot API (override the base URL to point the bot at a local fake server)
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+TELEGRAM_POLL_TIMEOUT = 30  # Seconds getUpdates waits server-side for new updates
+TELEGRAM_ALLOWED_UPDATES = ["message", "callback_query"]
+DISPATCH_WORKERS = int(os.getenv("DISPATCH_WORKERS", "8"))  # Threads handling incoming updates (one chat at a time each)
+
+# Webhook mode: set WEBHOOK_URL to the public HTTPS URL Telegram should call instead of polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_LISTEN_HOST = os.getenv("WEBHOOK_LISTEN_HOST", "0.0.0.0")
+WEBHOOK_LISTEN_PORT = int(os.getenv("WEBHOOK_LISTEN_PORT", "8443"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+
+# Telegram send queue (limits follow Telegram's documented bot limits)
+TELEGRAM_SEND_WORKERS = 4
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))  # Messages per second across all chats
+TELEGRAM_PER_CHAT_RATE = 1  # Messages per second to a single chat
+TELEGRAM_PER_CHAT_BURST = 3  # Short bursts allowed per chat
+TELEGRAM_MAX_RETRIES = 5
+TELEGRAM_TIMEOUT = 30  # Seconds per API request
+
+# Digest notifications
+TELEGRAM_MESSAGE_LIMIT = 4096  # Maximum characters in one Telegram message
+DIGEST_MAX_PAGINATIONS = 1000  # "More" button pages kept in memory
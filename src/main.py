@@ -1,26 +1,57 @@
 # main.py
 import time
+STARTED = time.perf_counter()  # Start of the startup-time breakdown
+
 from dotenv import load_dotenv
 import os
-from messaging.telegram import TelegramMessenger
-from services.filter_service import FilterService
-from bot.telegram_bot import TelegramBot
-from constants.constants import FILTERS_FILE
 
-# Load environment variables
+# Load environment variables before importing modules that read settings from them
 load_dotenv()
 
+# Scraping libraries (selenium, bs4, lxml) are imported on first use, so these imports stay light
+from messaging.telegram import TelegramMessenger
+from storage.backends import create_filter_store
+from bot.telegram_bot import TelegramBot
+from metrics.server import MetricsServer
+from metrics.startup import StartupTimer
+from constants.constants import RUNTIME, METRICS_HOST, METRICS_PORT, SCRAPE_BACKEND, SEARCH_EXECUTION
+
 def main():
-    # Initialize the filter service
-    filter_service = FilterService(FILTERS_FILE)
+    startup = StartupTimer(STARTED)
+    startup.mark("imports")
+    
+    # Initialize the filter service for the configured storage backend
+    filter_service = create_filter_store()
+    startup.mark("filters")
     
-    # Initialize the messenger
     token = os.getenv("TOKEN")
+    
+    if METRICS_PORT:
+        MetricsServer(METRICS_HOST, METRICS_PORT).start()
+    
+    if SCRAPE_BACKEND != "http" and SEARCH_EXECUTION != "queue":
+        # Have chromedriver ready before the first browser scrape needs it
+        from scrapers.driver_pool import prefetch_driver_path
+        prefetch_driver_path()
+    
+    if RUNTIME == "asyncio":
+        # Imported here: aiohttp is only needed for this runtime
+        from messaging.telegram_async import AsyncTelegramMessenger
+        from bot.async_runtime import AsyncBotRuntime
+        
+        bot = TelegramBot(AsyncTelegramMessenger(token), filter_service)
+        runtime = AsyncBotRuntime(bot)
+        startup.ready("bot")
+        runtime.run()
+        return
+    
+    # Initialize the messenger
     messenger = TelegramMessenger(token)
     
     # Create and run the bot
     bot = TelegramBot(messenger, filter_service)
-    bot.run()
+    startup.mark("bot")
+    bot.run(on_ready=startup.ready)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -20,4 +20,12 @@ class BaseMessenger(ABC):
     @abstractmethod
     def send_buttons(self, recipient_id, text, buttons):
         """Send interactive buttons to a user"""
-        pass
\ No newline at end of file
+        pass
+    
+    def delete_webhook(self):
+        """Stop any webhook delivery so polling works (no-op for platforms without webhooks)"""
+        pass
+    
+    def serve_webhook(self, url, host, port, secret_token=None):
+        """Receive updates through a webhook instead of polling"""
+        raise NotImplementedError(f"{type(self).__name__} does not support webhooks")
\ No newline at end of file
@@ -0,0 +1,63 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from constants.constants import DISPATCH_WORKERS
+from metrics.registry import gauge
+
+logger = logging.getLogger(__name__)
+
+def update_chat_id(update):
+    """Chat an update belongs to, used as its ordering key"""
+    if "callback_query" in update:
+        return update["callback_query"].get("message", {}).get("chat", {}).get("id")
+    if "message" in update:
+        return update["message"].get("chat", {}).get("id")
+    return None
+
+class UpdateDispatcher:
+    """Hands updates to a worker pool, keeping updates from the same chat in order
+
+    Different chats are handled in parallel; a chat's next update starts only
+    after its previous one has finished.
+    """
+
+    def __init__(self, handler, max_workers=DISPATCH_WORKERS):
+        self.handler = handler
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dispatch")
+        self._lock = threading.Lock()
+        self._pending = {}  # chat_id -> deque of updates waiting behind the one in progress
+        gauge("update_queue_depth", "Incoming updates waiting behind one from the same chat").set_function(self.queue_depth)
+
+    def submit(self, update):
+        """Queue an update and return immediately"""
+        chat_id = update_chat_id(update)
+        with self._lock:
+            if chat_id in self._pending:
+                self._pending[chat_id].append(update)
+                return
+            self._pending[chat_id] = deque()
+        self._pool.submit(self._run_chat, chat_id, update)
+
+    def _run_chat(self, chat_id, update):
+        """Handle updates for one chat until its queue is empty"""
+        while True:
+            try:
+                self.handler(update)
+            except Exception as e:
+                logger.error(f"Error handling update {update.get('update_id')} for chat {chat_id}: {e}", exc_info=True)
+            with self._lock:
+                pending = self._pending[chat_id]
+                if not pending:
+                    del self._pending[chat_id]
+                    return
+                update = pending.popleft()
+
+    def queue_depth(self):
+        """Number of updates waiting behind ones already being handled"""
+        with self._lock:
+            return sum(len(pending) for pending in self._pending.values())
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
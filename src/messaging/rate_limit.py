@@ -0,0 +1,64 @@
+import threading
+import time
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self):
+        """Take a token, returning how many seconds the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """Block until a token is available"""
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        """Drain the bucket so no token is available for `seconds` (e.g. after a 429)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+class KeyedTokenBuckets:
+    """One token bucket per key (e.g. per chat), created on demand"""
+
+    def __init__(self, rate, capacity, max_idle=600):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_idle = max_idle
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) > 10000:
+                    self._evict_idle()
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+            return bucket
+
+    def _evict_idle(self):
+        """Forget buckets that have been idle long enough to be full again"""
+        cutoff = time.monotonic() - self.max_idle
+        for key in [key for key, bucket in self._buckets.items() if bucket._updated < cutoff]:
+            del self._buckets[key]
@@ -1,50 +1,261 @@
 import requests
+import heapq
+import itertools
 import json
 import logging
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
 from .base import BaseMessenger
+from .rate_limit import TokenBucket, KeyedTokenBuckets
+from .webhook import WebhookServer
+from .dispatcher import UpdateDispatcher
+from constants.constants import (
+    TELEGRAM_API_BASE, TELEGRAM_SEND_WORKERS, TELEGRAM_GLOBAL_RATE, TELEGRAM_PER_CHAT_RATE,
+    TELEGRAM_PER_CHAT_BURST, TELEGRAM_MAX_RETRIES, TELEGRAM_TIMEOUT,
+    TELEGRAM_POLL_TIMEOUT, TELEGRAM_ALLOWED_UPDATES
+)
+from metrics.registry import counter, gauge, histogram
+
+TELEGRAM_REQUESTS = counter("telegram_requests_total", "Telegram Bot API send calls by method and HTTP status", ("method", "status"))
+TELEGRAM_RATE_LIMITED = counter("telegram_rate_limited_total", "Sends refused by Telegram with 429 Too Many Requests")
+TELEGRAM_REQUEST_SECONDS = histogram("telegram_request_seconds", "Latency of Telegram Bot API send calls", ("method",))
+POLL_ERROR_DELAY = 5  # Seconds to wait after a failed getUpdates when Telegram gives no retry_after
+
+class TelegramAPIError(Exception):
+    """Telegram answered a call with ok=false (e.g. 409 while another poller or a webhook is active, or 401)"""
+
+    def __init__(self, method, status, response):
+        self.status = status
+        self.retry_after = response.get("parameters", {}).get("retry_after")
+        super().__init__(f"{method} failed with {status}: {response.get('description', response)}")
+
+def response_json(response):
+    """A requests response's JSON body, or {} if it isn't JSON (e.g. an HTML error page from a proxy)"""
+    try:
+        return response.json()
+    except ValueError:
+        return {}
+
+class OutgoingMessage:
+    """One queued Bot API call and its retry state"""
+
+    __slots__ = ("method", "payload", "attempts", "has_token")
+
+    def __init__(self, method, payload):
+        self.method = method
+        self.payload = payload
+        self.attempts = 0
+        self.has_token = False  # A per-chat rate limit token was reserved for the next attempt
+
+def check_updates_response(status, response):
+    """The updates of a getUpdates response; raises TelegramAPIError unless Telegram reported success"""
+    if status != 200 or not response.get("ok"):
+        raise TelegramAPIError("getUpdates", status, response)
+    return response.get("result", [])
 
 class TelegramMessenger(BaseMessenger):
-    """Implementation for Telegram messaging platform"""
+    """Implementation for Telegram messaging platform
+    
+    Outgoing messages are queued per chat and sent by worker threads over a
+    shared session, within Telegram's global and per-chat rate limits. Chats
+    with queued messages wait in a heap by the time their next message may
+    go out: a chat held back by its own rate limit, a retry backoff or a 429
+    is put back with a later time instead of a worker sleeping on it, so
+    other chats keep being served. Only one message per chat is in flight,
+    so each chat's messages stay in order.
+    Incoming updates are handled on a worker pool, serialized per chat.
+    """
     
-    def __init__(self, token):
+    def __init__(self, token, api_base=TELEGRAM_API_BASE):
         self.token = token
-        self.api_url = f"https://api.telegram.org/bot{token}"
+        self.api_url = f"{api_base}/bot{token}"
         self.last_update_id = None
         self.callback_handler = None
         self.message_handler = None
-
+        self.dispatcher = UpdateDispatcher(self._handle_update)
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=TELEGRAM_SEND_WORKERS + 1)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        self.global_bucket = TokenBucket(TELEGRAM_GLOBAL_RATE, TELEGRAM_GLOBAL_RATE)
+        self.chat_buckets = KeyedTokenBuckets(TELEGRAM_PER_CHAT_RATE, TELEGRAM_PER_CHAT_BURST)
+        send_lock = threading.Lock()
+        self._send_ready = threading.Condition(send_lock)  # A chat was scheduled
+        self._all_sent = threading.Condition(send_lock)  # Nothing is left to send
+        self._chat_queues = {}  # chat_id -> deque of OutgoingMessage, while it has any
+        self._ready = []  # Heap of (not before, sequence, chat_id), one entry per chat not being sent to
+        self._sequence = itertools.count()
+        self._unsent = 0
+        for index in range(TELEGRAM_SEND_WORKERS):
+            threading.Thread(target=self._send_worker, name=f"telegram-send-{index}", daemon=True).start()
+        gauge("telegram_send_queue_depth", "Outgoing messages waiting to be sent").set_function(lambda: self._unsent)
+    
     def set_handlers(self, message_handler, callback_handler):
         """Set the handlers for messages and callbacks"""
         self.message_handler = message_handler
         self.callback_handler = callback_handler
     
     def get_updates(self):
-        """Fetch new updates from Telegram"""
-        params = {"offset": self.last_update_id} if self.last_update_id else {}
-        response = requests.get(f"{self.api_url}/getUpdates", params=params).json()
+        """Long-poll Telegram for new updates and dispatch them to the handlers"""
+        params = {
+            "timeout": TELEGRAM_POLL_TIMEOUT,
+            "allowed_updates": json.dumps(TELEGRAM_ALLOWED_UPDATES)
+        }
+        if self.last_update_id:
+            params["offset"] = self.last_update_id
+        response = self.session.get(
+            f"{self.api_url}/getUpdates", params=params, timeout=TELEGRAM_POLL_TIMEOUT + TELEGRAM_TIMEOUT
+        )
         
-        if "result" in response:
-            for update in response["result"]:
-                self.last_update_id = update["update_id"] + 1
-                if "callback_query" in update and self.callback_handler:
-                    self.callback_handler(update["callback_query"])
-                elif "message" in update and self.message_handler:
-                    self.message_handler(update)
+        for update in check_updates_response(response.status_code, response.json()):
+            self.process_update(update)
+            # Acknowledge only once the update has been handed off
+            self.last_update_id = update["update_id"] + 1
+    
+    def process_update(self, update):
+        """Hand one update to the dispatcher; handlers run on worker threads"""
+        self.dispatcher.submit(update)
+    
+    def _handle_update(self, update):
+        """Route one update to the message or callback handler"""
+        if "callback_query" in update and self.callback_handler:
+            self.callback_handler(update["callback_query"])
+        elif "message" in update and self.message_handler:
+            self.message_handler(update)
+    
+    def delete_webhook(self):
+        """Remove any webhook so getUpdates polling works"""
+        return self.session.post(f"{self.api_url}/deleteWebhook", timeout=TELEGRAM_TIMEOUT).json()
+    
+    def serve_webhook(self, url, host, port, secret_token=None):
+        """Register `url` as the bot's webhook and serve updates from a local HTTP server until stopped"""
+        path = urlparse(url).path or "/"
+        server = WebhookServer(self.process_update, host, port, path, secret_token)
+        payload = {"url": url, "allowed_updates": json.dumps(TELEGRAM_ALLOWED_UPDATES)}
+        if secret_token:
+            payload["secret_token"] = secret_token
+        response = self.session.post(f"{self.api_url}/setWebhook", data=payload, timeout=TELEGRAM_TIMEOUT).json()
+        logging.info(f"Registered webhook {url}: {response.get('description', response)}")
+        server.serve_forever()
     
     def send_message(self, chat_id, text):
-        """Send a message to the user"""
+        """Queue a message to the user; returns immediately"""
         payload = {"chat_id": chat_id, "text": text}
-        response = requests.post(f"{self.api_url}/sendMessage", data=payload)
-        logging.info(f"Sent message to {chat_id}: {text}")
-        return response.json()
+        self._enqueue(chat_id, "sendMessage", payload)
     
     def send_buttons(self, chat_id, text, buttons):
-        """Send inline buttons to the user"""
+        """Queue inline buttons to the user; returns immediately"""
         payload = {
             "chat_id": chat_id,
             "text": text,
             "reply_markup": json.dumps({"inline_keyboard": buttons})
         }
-        response = requests.post(f"{self.api_url}/sendMessage", data=payload)
-        logging.info(f"Sent inline buttons to {chat_id}")
-        return response.json()
\ No newline at end of file
+        self._enqueue(chat_id, "sendMessage", payload)
+    
+    def flush(self):
+        """Block until every queued message has been sent (or given up on)"""
+        with self._all_sent:
+            self._all_sent.wait_for(lambda: not self._unsent)
+    
+    def _enqueue(self, chat_id, method, payload):
+        with self._send_ready:
+            self._unsent += 1
+            chat_queue = self._chat_queues.get(chat_id)
+            if chat_queue is None:
+                chat_queue = self._chat_queues[chat_id] = deque()
+                self._schedule(chat_id, 0)
+            chat_queue.append(OutgoingMessage(method, payload))
+    
+    def _schedule(self, chat_id, delay):
+        """Make the chat's next message due in `delay` seconds; caller holds the send lock"""
+        heapq.heappush(self._ready, (time.monotonic() + delay, next(self._sequence), chat_id))
+        self._send_ready.notify()
+    
+    def _next_message(self):
+        """Wait for the chat whose next message is due soonest and take it off the heap"""
+        with self._send_ready:
+            while True:
+                now = time.monotonic()
+                if self._ready and self._ready[0][0] <= now:
+                    _, _, chat_id = heapq.heappop(self._ready)
+                    return chat_id, self._chat_queues[chat_id][0]
+                self._send_ready.wait(self._ready[0][0] - now if self._ready else None)
+    
+    def _send_worker(self):
+        """Send due messages one at a time, putting back chats that have to wait"""
+        while True:
+            chat_id, message = self._next_message()
+            try:
+                retry_in = self._attempt(chat_id, message)
+            except Exception as e:
+                logging.error(f"Error sending {message.method} to {chat_id}: {e}", exc_info=True)
+                retry_in = None
+            with self._send_ready:
+                chat_queue = self._chat_queues[chat_id]
+                if retry_in is None:
+                    chat_queue.popleft()
+                    self._unsent -= 1
+                    if not self._unsent:
+                        self._all_sent.notify_all()
+                    if not chat_queue:
+                        del self._chat_queues[chat_id]
+                        continue
+                    retry_in = 0
+                self._schedule(chat_id, retry_in)
+    
+    def _attempt(self, chat_id, message):
+        """Try to send one message; returns seconds until it should be tried again, or None once it is done with"""
+        if not message.has_token:
+            message.has_token = True
+            delay = self.chat_buckets.get(chat_id).reserve()
+            if delay:
+                return delay  # The chat is over its rate limit; its token is ready when it next comes due
+        self.global_bucket.acquire()
+        message.has_token = False
+        message.attempts += 1
+        method, payload = message.method, message.payload
+        
+        try:
+            with TELEGRAM_REQUEST_SECONDS.time(method=method):
+                response = self.session.post(f"{self.api_url}/{method}", data=payload, timeout=TELEGRAM_TIMEOUT)
+        except requests.RequestException as e:
+            TELEGRAM_REQUESTS.inc(method=method, status="network_error")
+            logging.warning(f"Telegram {method} to {chat_id} failed ({e})")
+            return self._retry_in(chat_id, message, 2 ** (message.attempts - 1))
+        TELEGRAM_REQUESTS.inc(method=method, status=response.status_code)
+        
+        if response.status_code == 429:
+            TELEGRAM_RATE_LIMITED.inc()
+            # Honor Telegram's flood control and hold back every other send too
+            retry_after = response_json(response).get("parameters", {}).get("retry_after", 2 ** (message.attempts - 1))
+            logging.warning(f"Rate limited sending to {chat_id}, retrying after {retry_after}s")
+            self.chat_buckets.get(chat_id).pause(retry_after)
+            self.global_bucket.pause(retry_after)
+            return self._retry_in(chat_id, message, retry_after)
+        if response.status_code >= 500:
+            logging.warning(f"Telegram returned {response.status_code} for {chat_id}")
+            return self._retry_in(chat_id, message, 2 ** (message.attempts - 1))
+        if response.status_code >= 400:
+            # Not worth retrying: a bad request, or the user blocked the bot (403)
+            logging.error(f"Telegram rejected {method} to {chat_id} with {response.status_code}: "
+                          f"{response_json(response).get('description', response.text)}")
+            return None
+        
+        if method == "sendMessage" and "reply_markup" in payload:
+            logging.info(f"Sent inline buttons to {chat_id}")
+        else:
+            logging.info(f"Sent message to {chat_id}: {payload.get('text')}")
+        return None
+    
+    def _retry_in(self, chat_id, message, delay):
+        """`delay`, or None (giving up) once the message is out of retries"""
+        if message.attempts > TELEGRAM_MAX_RETRIES:
+            logging.error(f"Giving up on {message.method} to {chat_id} after {TELEGRAM_MAX_RETRIES} retries")
+            return None
+        logging.info(f"Retrying {message.method} to {chat_id} in {delay}s")
+        return delay
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency, only needed for RUNTIME=asyncio
+    aiohttp = None
+
+from .base import BaseMessenger
+from .dispatcher import update_chat_id
+from .rate_limit import TokenBucket, KeyedTokenBuckets
+from constants.constants import (
+    TELEGRAM_API_BASE, TELEGRAM_GLOBAL_RATE, TELEGRAM_PER_CHAT_RATE, TELEGRAM_PER_CHAT_BURST,
+    TELEGRAM_MAX_RETRIES, TELEGRAM_TIMEOUT, TELEGRAM_POLL_TIMEOUT, TELEGRAM_ALLOWED_UPDATES,
+    HTTP_POOL_SIZE
+)
+from .telegram import (
+    TELEGRAM_REQUESTS, TELEGRAM_RATE_LIMITED, TELEGRAM_REQUEST_SECONDS, POLL_ERROR_DELAY,
+    TelegramAPIError, check_updates_response
+)
+
+logger = logging.getLogger(__name__)
+
+class AsyncTelegramMessenger(BaseMessenger):
+    """Telegram messaging on an asyncio event loop with a pooled aiohttp session
+
+    `send_message`/`send_buttons` keep the synchronous BaseMessenger signature
+    so the bot's handlers can call them from any thread; they schedule the send
+    on the loop and return immediately. Handlers run in the loop's default
+    executor, one update at a time per chat.
+    """
+
+    def __init__(self, token, api_base=TELEGRAM_API_BASE):
+        if aiohttp is None:
+            raise RuntimeError("The asyncio runtime needs aiohttp: pip install aiohttp")
+        self.token = token
+        self.api_url = f"{api_base}/bot{token}"
+        self.last_update_id = None
+        self.callback_handler = None
+        self.message_handler = None
+        self.loop = None
+        self.session = None
+        self.global_bucket = TokenBucket(TELEGRAM_GLOBAL_RATE, TELEGRAM_GLOBAL_RATE)
+        self.chat_buckets = KeyedTokenBuckets(TELEGRAM_PER_CHAT_RATE, TELEGRAM_PER_CHAT_BURST)
+        self._chat_locks = {}  # Key -> [FIFO lock, tasks holding or waiting for it], for ordering sends and handler calls
+        self._pending_sends = set()
+
+    def set_handlers(self, message_handler, callback_handler):
+        """Set the handlers for messages and callbacks"""
+        self.message_handler = message_handler
+        self.callback_handler = callback_handler
+
+    async def start(self):
+        """Bind to the running loop and open the HTTP session"""
+        self.loop = asyncio.get_running_loop()
+        connector = aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(connector=connector)
+        await self._call("deleteWebhook")
+
+    async def close(self):
+        if self._pending_sends:
+            await asyncio.gather(*self._pending_sends, return_exceptions=True)
+        await self.session.close()
+
+    @asynccontextmanager
+    async def _chat_lock(self, key):
+        """Hold the lock for `key`; it is dropped once no task holds or waits for it"""
+        entry = self._chat_locks.get(key)
+        if entry is None:
+            entry = self._chat_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._chat_locks[key]
+
+    async def _call(self, method, data=None, timeout=TELEGRAM_TIMEOUT):
+        async with self.session.post(f"{self.api_url}/{method}", data=data,
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            return response.status, await response.json(content_type=None)
+
+    async def get_updates(self):
+        """Long-poll getUpdates once and dispatch each update as its own task"""
+        data = {"timeout": TELEGRAM_POLL_TIMEOUT, "allowed_updates": json.dumps(TELEGRAM_ALLOWED_UPDATES)}
+        if self.last_update_id:
+            data["offset"] = self.last_update_id
+        status, response = await self._call("getUpdates", data, timeout=TELEGRAM_POLL_TIMEOUT + TELEGRAM_TIMEOUT)
+
+        for update in check_updates_response(status, response):
+            self.loop.create_task(self._handle_update(update))
+            # Acknowledge only once the update has been handed off
+            self.last_update_id = update["update_id"] + 1
+
+    async def poll_forever(self):
+        """Call `get_updates` until cancelled, backing off after network and API errors"""
+        while True:
+            try:
+                await self.get_updates()
+            except TelegramAPIError as e:
+                logger.error(f"Error fetching updates: {e}")
+                await asyncio.sleep(e.retry_after or POLL_ERROR_DELAY)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                # ValueError: a body that isn't JSON, e.g. an HTML 502/504 page from Telegram's proxy
+                logger.error(f"Error fetching updates: {e!r}")
+                await asyncio.sleep(POLL_ERROR_DELAY)
+
+    async def _handle_update(self, update):
+        """Run the sync handler off the loop, one update at a time per chat"""
+        async with self._chat_lock(update_chat_id(update)):
+            try:
+                if "callback_query" in update and self.callback_handler:
+                    await asyncio.to_thread(self.callback_handler, update["callback_query"])
+                elif "message" in update and self.message_handler:
+                    await asyncio.to_thread(self.message_handler, update)
+            except Exception as e:
+                logger.error(f"Error handling update {update.get('update_id')}: {e}", exc_info=True)
+
+    def send_message(self, chat_id, text):
+        """Schedule a message to the user; returns immediately"""
+        self._schedule_send(chat_id, {"chat_id": chat_id, "text": text})
+
+    def send_buttons(self, chat_id, text, buttons):
+        """Schedule inline buttons to the user; returns immediately"""
+        self._schedule_send(chat_id, {
+            "chat_id": chat_id,
+            "text": text,
+            "reply_markup": json.dumps({"inline_keyboard": buttons})
+        })
+
+    def _schedule_send(self, chat_id, payload):
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            task = self.loop.create_task(self._send(chat_id, payload))
+            self._pending_sends.add(task)
+            task.add_done_callback(self._pending_sends.discard)
+        else:
+            asyncio.run_coroutine_threadsafe(self._send(chat_id, payload), self.loop)
+
+    async def _send(self, chat_id, payload):
+        """Send with per-chat ordering, rate limits and retries"""
+        async with self._chat_lock(("send", chat_id)):
+            chat_bucket = self.chat_buckets.get(chat_id)
+            for attempt in range(TELEGRAM_MAX_RETRIES + 1):
+                await asyncio.sleep(chat_bucket.reserve())
+                await asyncio.sleep(self.global_bucket.reserve())
+                try:
+                    with TELEGRAM_REQUEST_SECONDS.time(method="sendMessage"):
+                        status, response = await self._call("sendMessage", payload)
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    # ValueError: a body that isn't JSON, e.g. an HTML 502/504 page from Telegram's proxy
+                    TELEGRAM_REQUESTS.inc(method="sendMessage",
+                                          status="bad_response" if isinstance(e, ValueError) else "network_error")
+                    logger.warning(f"Telegram sendMessage to {chat_id} failed ({e!r}), retrying")
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+
+                TELEGRAM_REQUESTS.inc(method="sendMessage", status=status)
+                if status == 429:
+                    TELEGRAM_RATE_LIMITED.inc()
+                    retry_after = response.get("parameters", {}).get("retry_after", 2 ** attempt)
+                    logger.warning(f"Rate limited sending to {chat_id}, retrying after {retry_after}s")
+                    chat_bucket.pause(retry_after)
+                    self.global_bucket.pause(retry_after)
+                    continue
+                if status >= 500:
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                if status >= 400:
+                    # Not worth retrying: a bad request, or the user blocked the bot (403)
+                    logger.error(f"Telegram rejected sendMessage to {chat_id} with {status}: "
+                                 f"{response.get('description', response)}")
+                    return None
+
+                logger.info(f"Sent message to {chat_id}: {payload['text']}")
+                return response
+
+            logger.error(f"Giving up on sendMessage to {chat_id} after {TELEGRAM_MAX_RETRIES} retries")
@@ -0,0 +1,59 @@
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+class WebhookServer:
+    """Small local HTTP server that receives Telegram updates and hands them to a callback"""
+
+    def __init__(self, on_update, host, port, path="/", secret_token=None):
+        self.on_update = on_update
+        self.path = path
+        self.secret_token = secret_token
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+
+    @property
+    def address(self):
+        """(host, port) actually bound, useful when port 0 was requested"""
+        return self.httpd.server_address
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != server.path:
+                    self.send_error(404)
+                    return
+                if server.secret_token and self.headers.get("X-Telegram-Bot-Api-Secret-Token") != server.secret_token:
+                    self.send_error(403)
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    update = json.loads(self.rfile.read(length))
+                except (ValueError, json.JSONDecodeError):
+                    self.send_error(400)
+                    return
+
+                # Acknowledge first so Telegram doesn't retry while the handler runs
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                try:
+                    server.on_update(update)
+                except Exception as e:
+                    logger.error(f"Error handling webhook update: {e}", exc_info=True)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def serve_forever(self):
+        logger.info(f"Webhook server listening on {self.address[0]}:{self.address[1]}{self.path}")
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,50 @@
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .registry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class MetricsServer:
+    """Small local HTTP server exposing the metrics registry at /metrics for Prometheus to scrape"""
+
+    def __init__(self, host, port, registry=REGISTRY):
+        self.registry = registry
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+
+    @property
+    def address(self):
+        """(host, port) actually bound, useful when port 0 was requested"""
+        return self.httpd.server_address
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = server.registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def start(self):
+        """Serve from a daemon thread and return immediately"""
+        threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"Metrics available at http://{self.address[0]}:{self.address[1]}/metrics")
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,31 @@
+import logging
+import time
+
+from metrics.registry import gauge
+
+logger = logging.getLogger(__name__)
+
+STARTUP_SECONDS = gauge("startup_seconds", "Time spent in each startup phase of this process", ("phase",))
+
+class StartupTimer:
+    """Records how long each startup phase takes, from `started` until the bot is ready for updates"""
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.phases = {}
+        self._last = self.started
+
+    def mark(self, name):
+        """End the current phase, naming it, and start the next one"""
+        now = time.perf_counter()
+        self.phases[name] = now - self._last
+        self._last = now
+        STARTUP_SECONDS.set(self.phases[name], phase=name)
+
+    def ready(self, name="ready"):
+        """End the last phase and log the breakdown"""
+        self.mark(name)
+        total = self._last - self.started
+        STARTUP_SECONDS.set(total, phase="total")
+        breakdown = ", ".join(f"{name}={seconds:.3f}s" for name, seconds in self.phases.items())
+        logger.info(f"Started in {total:.3f}s: {breakdown}")
@@ -0,0 +1,51 @@
+"""Optional per-stage tracing spans.
+
+With TRACING off (the default) `span()` returns a shared no-op context
+manager, so instrumented code pays one function call and one flag check.
+With it on, each span logs its duration, trace ID and parent span to the
+"trace" logger.
+"""
+import contextvars
+import itertools
+import logging
+import time
+from contextlib import nullcontext
+
+from constants.constants import TRACING
+
+trace_logger = logging.getLogger("trace")
+
+_NOOP = nullcontext()
+_ids = itertools.count(1)
+_current = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    """One timed stage; nested spans share their root's trace ID"""
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.parent = _current.get()
+        self.span_id = next(_ids)
+        self.trace_id = self.parent.trace_id if self.parent else self.span_id
+        self._token = _current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _current.reset(self._token)
+        attributes = "".join(f" {key}={value}" for key, value in self.attributes.items())
+        parent = self.parent.span_id if self.parent else "-"
+        status = f" error={exc_type.__name__}" if exc_type else ""
+        trace_logger.info(f"trace={self.trace_id} span={self.span_id} parent={parent} "
+                          f"name={self.name} duration={duration * 1000:.1f}ms{attributes}{status}")
+        return False
+
+def span(name, **attributes):
+    """Context manager timing one pipeline stage when tracing is enabled"""
+    if not TRACING:
+        return _NOOP
+    return Span(name, attributes)
@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+from constants.constants import HOST_FAILURE_THRESHOLD, HOST_COOLDOWN, HOST_MAX_COOLDOWN, BLOCK_MARKERS
+from metrics.registry import gauge
+
+logger = logging.getLogger(__name__)
+
+class BlockedError(Exception):
+    """Craigslist refused the request or served a CAPTCHA instead of results"""
+    pass
+
+class CircuitOpenError(Exception):
+    """The subdomain's breaker is open, so the request was not sent"""
+    pass
+
+def check_blocked(url, html):
+    """Raises BlockedError if the page is a block notice or CAPTCHA rather than search results"""
+    page = html.lower()
+    for marker in BLOCK_MARKERS:
+        if marker in page:
+            raise BlockedError(f"{url} served a block page ({marker!r})")
+
+class CircuitBreaker:
+    """Stops sending requests to a subdomain that keeps failing
+
+    Closed: requests flow. After `failure_threshold` consecutive failures, or
+    one block/CAPTCHA page, the breaker opens and refuses requests for
+    `cooldown` seconds. It then lets a single probe through (half-open): a
+    success closes it again; a failure reopens it with the cooldown doubled,
+    up to `max_cooldown`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, host, failure_threshold=HOST_FAILURE_THRESHOLD, cooldown=HOST_COOLDOWN,
+                 max_cooldown=HOST_MAX_COOLDOWN):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = cooldown
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_in(self):
+        """Seconds until a request would be let through (0 when one would be now)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            if self.state == self.HALF_OPEN and self._probing:
+                return self.base_cooldown  # Wait for the probe's verdict
+            return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def allow(self):
+        """True if a request may be sent now; in half-open state only one probe is let through"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() < self.opened_at + self.cooldown:
+                    return False
+                self.state = self.HALF_OPEN
+            if self._probing:
+                return False
+            self._probing = True
+            logger.info(f"Probing {self.host} after a {self.cooldown:.0f}s cooldown")
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"{self.host} recovered, closing its circuit breaker")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self._probing = False
+
+    def record_failure(self, blocked=False):
+        """Count a failed request; `blocked` (a block page or CAPTCHA) opens the breaker at once"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                self._open()
+            elif self.state == self.CLOSED and (blocked or self.failures >= self.failure_threshold):
+                self._open()
+            self._probing = False
+
+    def cancel_probe(self):
+        """Forget a probe that was let through but never sent, so another one can go"""
+        with self._lock:
+            self._probing = False
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        logger.warning(f"Circuit breaker for {self.host} open for {self.cooldown:.0f}s after {self.failures} failure(s)")
+
+class HostBreakers:
+    """One CircuitBreaker per Craigslist subdomain, created on first use"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    def get(self, host):
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(host)
+            return self._breakers[host]
+
+    def snapshot(self):
+        """{host: state} for every subdomain whose breaker is not closed"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.host: breaker.state for breaker in breakers if breaker.state != CircuitBreaker.CLOSED}
+
+_breakers = HostBreakers()
+
+BREAKERS_OPEN = gauge("circuit_breakers_open", "Subdomains whose circuit breaker is open or half-open")
+BREAKERS_OPEN.set_function(lambda: len(_breakers.snapshot()))
+
+def host_breaker(url):
+    """The circuit breaker for a URL's subdomain"""
+    return _breakers.get(urlparse(url).netloc)
+
+def host_retry_in(host):
+    """Seconds until requests to `host` are allowed again; 0 for a healthy subdomain"""
+    return _breakers.get(host).retry_in()
+
+def get_breaker_states():
+    """Returns {host: state} for every subdomain currently cooling down or being probed."""
+    return _breakers.snapshot()
@@ -1,190 +1,269 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.options import Options
-from bs4 import BeautifulSoup
+import asyncio
 import logging
-import json
-import os
-import time
-from constants.constants import FILTERS_FILE, RESULTS_FILE, LINKS_FILE
-
-def load_config(config_file=FILTERS_FILE):
-    """Loads search parameters from config file."""
-    with open(config_file, 'r') as file:
-        return json.load(file)
-
-def load_existing_links():
-    """Loads the list of previously scraped links from the file."""
-    if os.path.exists(LINKS_FILE):
-        with open(LINKS_FILE, 'r') as file:
-            return set(line.strip() for line in file.readlines())
-    return set()
-
-def save_link_to_file(link):
-    """Saves a new link to the file."""
-    with open(LINKS_FILE, 'a') as file:
-        file.write(link + '\n')
+from urllib.parse import urlencode
+from constants.constants import (
+    SCRAPE_BACKEND, INCREMENTAL_MAX_PAGES, INCREMENTAL_STOP_AFTER, CRAIGSLIST_BASE_URL, RESULTS_PAGE_MARKERS
+)
+from scrapers.driver_pool import get_driver_pool
+from scrapers import http_fetcher
+from scrapers.parsers import get_parser
+from scrapers.sites import resolve_location
+from scrapers.circuit_breaker import BlockedError, CircuitOpenError, check_blocked, host_breaker
+from scrapers.waits import ScrapeTimer, wait_for_results, throttle_host, reserve_host_slot
+from services.seen_store import get_seen_store, posting_id
+from services.results_sink import get_results_sink
+from services.match_engine import parse_price
+from metrics.registry import counter, histogram
+from metrics.tracing import span
 
-def save_results(results):
-    """Saves the scraped results to a JSON file safely."""
-    if os.path.exists(RESULTS_FILE):
-        try:
-            with open(RESULTS_FILE, 'r') as file:
-                existing_results = json.load(file)
-        except (json.JSONDecodeError, ValueError):
-            existing_results = []  
-    else:
-        existing_results = []
+logger = logging.getLogger(__name__)
 
-    existing_results.extend(results)
+SCRAPE_FAILURES = counter("scrape_failures_total", "Failed scrapes by subdomain and reason", ("host", "reason"))
+DEDUP_CHECKED = counter("dedup_checked_total", "Listings checked against a user's seen postings")
+DEDUP_HITS = counter("dedup_hits_total", "Listings dropped because the user had already been sent them")
+RESULTS_WRITE_SECONDS = histogram("results_write_seconds", "Time to persist one batch of results")
 
-    with open(RESULTS_FILE, 'w') as file:
-        json.dump(existing_results, file, indent=4, ensure_ascii=False)
+def save_results(results):
+    """Appends the scraped results to the results log."""
+    with span("persist", results=len(results)), RESULTS_WRITE_SECONDS.time():
+        get_results_sink().write(results)
 
 def build_search_url(search_params):
-    """Builds a Craigslist search URL based on item, location, and price."""
-    item = search_params['item']
-    location = search_params['location']
+    """Builds the canonical Craigslist search URL for an item, location and price.
+
+    The location is resolved through the site catalog (raising
+    UnknownLocationError if nothing matches) and the item is lowercased with
+    its whitespace collapsed, so equivalent searches always share one URL.
+    """
+    location = resolve_location(search_params['location'])
+    item = " ".join(str(search_params['item']).lower().split())
     price = search_params['price']
     
-    # Normalize location for URL
-    location_map = {
-        "San Francisco": "sfbay",
-        "Chicago": "chicago",
-        "New York": "newyork",
-        # Add more mappings as needed
-    }
-    
-    # Default to San Diego if location not in map
-    city_code = location_map.get(location, "sandiego")
-    
-    # Base URL with search query
-    url = f"https://{city_code}.craigslist.org/search/sss?query={item}"
-    
-    # Add price filter if specified
+    path = f"/search/{location.area}/sss" if location.area else "/search/sss"
+    # Newest listings first so incremental scrapes can stop early; "gta 5" is sent as query=gta+5
+    params = [("query", item), ("sort", "date")]
     if price and price.isdigit():
-        url += f"&max_price={price}"
+        params.append(("max_price", price))
     
-    return url
+    return f"{CRAIGSLIST_BASE_URL.format(city=location.code)}{path}?{urlencode(params)}"
+
+def fetch_with_selenium(url, timer):
+    """Renders the search page in a pooled headless Chrome session and returns its HTML."""
+    pool = get_driver_pool()
+    with timer.phase("acquire"):
+        session = pool.acquire()
+    try:
+        logger.info(f"Opening URL: {url}")
+        with timer.phase("fetch"):
+            session.driver.get(url)
+        with timer.phase("wait"):
+            wait_for_results(session.driver)  # Returns as soon as results render
+        html = session.driver.page_source
+    except Exception:
+        pool.release(session, broken=True)
+        raise
+    pool.release(session)
+    return html
+
+def iter_listings(html):
+    """Yields title, price and link for each listing, in page order, from a rendered gallery page or the static result list."""
+    return get_parser().iter_listings(html)
 
-def scrape_craigslist(url, search_params):
-    """Scrapes Craigslist listings from the given URL and returns them as a list of dictionaries."""
-    # Set up logging
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-    logger = logging.getLogger()
+def parse_new_listings(html, stop_at=None, stop_after=INCREMENTAL_STOP_AFTER):
+    """Extracts the listings whose posting ID is above `stop_at`, stopping after `stop_after` older ones in a row.
     
-    # Set up Chrome options to run in headless modefrom selenium.webdriver.chrome.options import Options
-    options = Options()
-    options.add_argument("--headless=new")  # Faster headless mode
-    options.add_argument("--disable-gpu")  
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")  # Prevents crashes due to limited `/dev/shm`
-    options.add_argument("--disable-blink-features=AutomationControlled")  # Avoid detection
-    options.add_argument("--disable-extensions")  # Speeds up loading
-    options.add_argument("--disable-infobars")  # Removes unnecessary UI
-    options.add_argument("--remote-debugging-port=9222")  # Allows Chrome to be debugged
-    options.add_argument("--window-size=1920,1080")
-    options.add_argument("--disable-renderer-backgrounding")  # Prevents Chrome from throttling when in the background
-    options.add_argument("--disable-background-timer-throttling")  # Speeds up timers
-    options.add_argument("--disable-backgrounding-occluded-windows")  
-    options.add_argument("--blink-settings=imagesEnabled=false")  # Disables images for faster loading
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36")
+    A renewed old post keeps its ID but sorts among the newest, so a single old ID
+    is skipped rather than taken as the end of the new postings.
+    Returns (listings, stopped, scanned): `stopped` is False when the page ran out
+    first, and `scanned` counts every listing read, skipped ones included.
+    """
+    listings = []
+    seen_in_a_row = scanned = 0
+    for listing in iter_listings(html):
+        scanned += 1
+        if stop_at is not None:
+            number = posting_number(listing['link'])
+            if number is not None and number <= stop_at:
+                seen_in_a_row += 1
+                if seen_in_a_row >= stop_after:
+                    return listings, True, scanned
+                continue
+        seen_in_a_row = 0
+        listings.append(listing)
+    return listings, False, scanned
+
+def posting_number(link):
+    """Numeric posting ID of a listing link, or None if it has none"""
+    pid = posting_id(link)
+    return int(pid) if pid.isdigit() else None
+
+def page_url(url, offset):
+    """URL of the results page starting at `offset`"""
+    return url if offset == 0 else f"{url}&s={offset}"
 
+def fetch_listings(url, backend=SCRAPE_BACKEND, stop_at=None):
+    """Fetches and parses a search page with the chosen backend ("http", "selenium" or "auto").
+    
+    "auto" tries plain HTTP first and falls back to Selenium when the page could not be
+    fetched or parsed; a search page that genuinely has no results is returned as empty.
+    With `stop_at` (the newest posting ID already processed for this query), already-seen
+    postings are skipped and parsing stops after INCREMENTAL_STOP_AFTER of them in a row;
+    another page is fetched only if the current one ran out first.
+    
+    Failures are counted against the subdomain's circuit breaker and re-raised; while
+    the breaker is open, CircuitOpenError is raised without sending a request.
+    """
+    breaker = host_breaker(url)
+    if not breaker.allow():
+        SCRAPE_FAILURES.inc(host=breaker.host, reason="circuit_open")
+        raise CircuitOpenError(f"{breaker.host} is cooling down for another {breaker.retry_in():.0f}s")
     
-    # Initialize the WebDriver
     try:
-        logger.info("Initializing Chrome WebDriver")
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+        listings = scrape_pages(url, backend, stop_at)
     except Exception as e:
-        logger.error(f"Error initializing Chrome WebDriver: {e}")
-        return []
+        record_scrape_failure(breaker, isinstance(e, BlockedError))
+        raise
+    breaker.record_success()
+    return listings
+
+def record_scrape_failure(breaker, blocked):
+    """Count a failed scrape against the subdomain's circuit breaker and the failure metric"""
+    SCRAPE_FAILURES.inc(host=breaker.host, reason="blocked" if blocked else "error")
+    breaker.record_failure(blocked=blocked)
+
+def scrape_pages(url, backend=SCRAPE_BACKEND, stop_at=None, throttle=throttle_host):
+    """The page-fetching part of fetch_listings, without the circuit breaker.
     
-    # Open the Craigslist page
+    Scrape workers call this directly and leave the breaker to the bot.
+    `throttle(url)` is called before each request to space requests to one host.
+    """
+    timer = ScrapeTimer(url)
     try:
-        logger.info(f"Opening URL: {url}")
-        driver.get(url)
-        time.sleep(5)  # Allow page to fully load
-    except Exception as e:
-        logger.error(f"Error opening URL {url}: {e}")
-        driver.quit()
-        return []
+        listings = []
+        offset = 0
+        for _ in range(INCREMENTAL_MAX_PAGES if stop_at is not None else 1):
+            page_listings, stopped, scanned = _fetch_page(page_url(url, offset), backend, timer, stop_at, throttle)
+            listings.extend(page_listings)
+            offset += scanned
+            if stopped or not scanned:
+                break
+    finally:
+        timer.report()
+    return listings
+
+def is_results_page(html):
+    """True if the page is a Craigslist search page, so an empty parse means the search really has no results"""
+    page = html.lower()
+    return any(marker in page for marker in RESULTS_PAGE_MARKERS)
+
+def _parse_page(url, html, stop_at):
+    listings, stopped, scanned = parse_new_listings(html, stop_at)
+    if not scanned and not is_results_page(html):
+        check_blocked(url, html)
+    return listings, stopped, scanned
+
+def _needs_browser(scanned, html):
+    """An HTTP page is retried in Chrome only if it parsed to nothing and isn't a genuine empty search"""
+    return not scanned and (html is None or not is_results_page(html))
+
+def _fetch_page(url, backend, timer, stop_at, throttle=throttle_host):
+    throttle(url)
     
-    # Get the page source after rendering
-    html = driver.page_source
-    driver.quit()
+    if backend in ("http", "auto"):
+        html = None
+        try:
+            with timer.phase("fetch"):
+                html = http_fetcher.fetch_page(url)
+            with timer.phase("parse"):
+                listings, stopped, scanned = _parse_page(url, html, stop_at)
+        except BlockedError:
+            raise  # Chrome comes from the same IP, so falling back to it would only be blocked too
+        except Exception as e:
+            if backend == "http":
+                raise
+            logger.warning(f"HTTP fetch failed for {url}: {e}")
+            listings, stopped, scanned = [], False, 0
+        if backend == "http" or not _needs_browser(scanned, html):
+            return listings, stopped, scanned
+        logger.info(f"No listings parsed over HTTP for {url}, falling back to Selenium")
     
-    # Parse the page with BeautifulSoup
-    soup = BeautifulSoup(html, 'html.parser')
-    listings = soup.find_all('div', class_='cl-search-result cl-search-view-mode-gallery')
+    html = fetch_with_selenium(url, timer)
+    with timer.phase("parse"):
+        return _parse_page(url, html, stop_at)
+
+async def fetch_listings_async(session, url, backend=SCRAPE_BACKEND, stop_at=None):
+    """Asyncio version of fetch_listings: HTTP runs on the loop, parsing and Selenium in worker threads."""
+    breaker = host_breaker(url)
+    if not breaker.allow():
+        SCRAPE_FAILURES.inc(host=breaker.host, reason="circuit_open")
+        raise CircuitOpenError(f"{breaker.host} is cooling down for another {breaker.retry_in():.0f}s")
     
-    # Load existing links
-    existing_links = load_existing_links()
+    timer = ScrapeTimer(url)
+    try:
+        listings = []
+        offset = 0
+        for _ in range(INCREMENTAL_MAX_PAGES if stop_at is not None else 1):
+            page_listings, stopped, scanned = await _fetch_page_async(
+                session, page_url(url, offset), backend, timer, stop_at)
+            listings.extend(page_listings)
+            offset += scanned
+            if stopped or not scanned:
+                break
+    except Exception as e:
+        record_scrape_failure(breaker, isinstance(e, BlockedError))
+        raise
+    finally:
+        timer.report()
+    breaker.record_success()
+    return listings
+
+async def _fetch_page_async(session, url, backend, timer, stop_at):
+    await asyncio.sleep(reserve_host_slot(url))
     
-    # Extract data from listings
-    extracted_listings = []
-    for listing in listings:
+    if backend in ("http", "auto"):
+        html = None
         try:
-            title_element = listing.find('a', class_='cl-app-anchor text-only posting-title')
-            if title_element:
-                title = title_element.find('span', class_='label').text.strip()
-            else:
-                continue
-                
-            price_element = listing.find('span', class_='priceinfo')
-            price = price_element.text.strip() if price_element else 'No price listed'
-            
-            link_element = listing.find('a', class_='main singleton')
-            if not link_element:
-                continue
-            link = link_element.get('href')
-            
-            if title and link and link not in existing_links:
-                extracted_listings.append({
-                    'title': title, 
-                    'price': price, 
-                    'link': link,
-                    'search_item': search_params['item'],
-                    'search_location': search_params['location'],
-                    'max_price': search_params['price']
-                })
-                save_link_to_file(link)
-                
+            with timer.phase("fetch"):
+                html = await http_fetcher.fetch_page_async(session, url)
+            with timer.phase("parse"):
+                listings, stopped, scanned = await asyncio.to_thread(_parse_page, url, html, stop_at)
+        except BlockedError:
+            raise
         except Exception as e:
-            logger.warning(f"Error extracting details for a listing: {e}")
+            if backend == "http":
+                raise
+            logger.warning(f"HTTP fetch failed for {url}: {e}")
+            listings, stopped, scanned = [], False, 0
+        if backend == "http" or not _needs_browser(scanned, html):
+            return listings, stopped, scanned
+        logger.info(f"No listings parsed over HTTP for {url}, falling back to Selenium")
     
-    return extracted_listings
+    html = await asyncio.to_thread(fetch_with_selenium, url, timer)
+    with timer.phase("parse"):
+        return await asyncio.to_thread(_parse_page, url, html, stop_at)
 
-def main(chat_id: str):
-    # Load config
-    config = load_config()
-    
-    all_results = []
-    for user_id, search_params_list in config.items():
-        if chat_id != user_id:  continue
-        for search_params in search_params_list:
-            try:
-                url = build_search_url(search_params)
-                print(f"Searching for {search_params['item']} in {search_params['location']} with max price ${search_params['price']}")
-                results = scrape_craigslist(url, search_params)
-                
-                # Add user ID to each result
-                for result in results:
-                    result['user_id'] = user_id
-                
-                all_results.extend(results)
-                print(f"Found {len(results)} results")
-                
-                # Sleep between requests to avoid rate limiting
-                time.sleep(3)
-                
-            except Exception as e:
-                print(f"Error processing search for {search_params}: {e}")
-    
-    # Save all results
-    save_results(all_results)
-    print(f"Total results saved: {len(all_results)}")
-    return all_results
+def filter_new_listings(listings, user_id):
+    """Returns the listings this user hasn't been sent before and marks them as seen."""
+    with span("dedup", listings=len(listings)):
+        new_listings = get_seen_store().claim(user_id, listings)
+    DEDUP_CHECKED.inc(len(listings))
+    DEDUP_HITS.inc(len(listings) - len(new_listings))
+    return new_listings
 
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+def build_results(listings, search_params, user_id=None):
+    """Tags parsed listings with the filter (and user) they were found for."""
+    results = []
+    for listing in listings:
+        result = {
+            'title': listing['title'], 
+            'price': listing['price'], 
+            'link': listing['link'],
+            'price_value': parse_price(listing['price']),
+            'search_item': search_params['item'],
+            'search_location': search_params['location'],
+            'max_price': search_params['price']
+        }
+        if user_id is not None:
+            result['user_id'] = user_id
+        results.append(result)
+    return results
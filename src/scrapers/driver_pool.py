@@ -0,0 +1,208 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from constants.constants import (DRIVER_POOL_SIZE, DRIVER_MAX_PAGES, DRIVER_ACQUIRE_TIMEOUT, CHROMEDRIVER_PATH,
+                                 DRIVER_PATH_CACHE_FILE, DRIVER_PATH_MAX_AGE_DAYS)
+from metrics.registry import histogram
+from metrics.tracing import span
+
+logger = logging.getLogger(__name__)
+
+BROWSER_START_SECONDS = histogram("browser_start_seconds", "Time to start a pooled Chrome session")
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+def _cached_driver_path(cache_file=DRIVER_PATH_CACHE_FILE, max_age=DRIVER_PATH_MAX_AGE_DAYS * 86400):
+    """The chromedriver path saved by an earlier run, if it is recent and the binary still exists"""
+    try:
+        with open(cache_file, "r") as file:
+            cached = json.load(file)
+    except (OSError, ValueError):
+        return None
+    path = cached.get("path")
+    if not path or not os.path.exists(path) or time.time() - cached.get("resolved_at", 0) > max_age:
+        return None
+    return path
+
+def _save_driver_path(path, cache_file=DRIVER_PATH_CACHE_FILE):
+    try:
+        with open(cache_file, "w") as file:
+            json.dump({"path": path, "resolved_at": time.time()}, file)
+    except OSError as e:
+        logger.warning(f"Could not cache the chromedriver path: {e}")
+
+def resolve_driver_path():
+    """Resolves the chromedriver binary once per process and reuses the path.
+
+    CHROMEDRIVER_PATH wins if set. Otherwise the path saved on disk by an
+    earlier run is reused, and webdriver_manager (which hits the network) is
+    only consulted when there is none or it is older than DRIVER_PATH_MAX_AGE_DAYS.
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = CHROMEDRIVER_PATH or _cached_driver_path()
+        if _driver_path is None:
+            logger.info("Resolving chromedriver binary")
+            # Imported here: webdriver_manager is only needed when the cached path is missing or stale
+            from webdriver_manager.chrome import ChromeDriverManager
+            _driver_path = ChromeDriverManager().install()
+            _save_driver_path(_driver_path)
+        return _driver_path
+
+def prefetch_driver_path():
+    """Resolve the chromedriver path on a background thread, so the first browser scrape doesn't wait for it"""
+    def prefetch():
+        try:
+            resolve_driver_path()
+        except Exception as e:
+            logger.warning(f"Could not resolve chromedriver ahead of time: {e}")
+    threading.Thread(target=prefetch, name="driver-path", daemon=True).start()
+
+def build_chrome_options():
+    """Builds the headless Chrome options shared by every pooled session."""
+    # Imported here, like the rest of selenium, so startup doesn't pay for it
+    from selenium.webdriver.chrome.options import Options
+    options = Options()
+    options.add_argument("--headless=new")  # Faster headless mode
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")  # Prevents crashes due to limited `/dev/shm`
+    options.add_argument("--disable-blink-features=AutomationControlled")  # Avoid detection
+    options.add_argument("--disable-extensions")  # Speeds up loading
+    options.add_argument("--disable-infobars")  # Removes unnecessary UI
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-renderer-backgrounding")  # Prevents Chrome from throttling when in the background
+    options.add_argument("--disable-background-timer-throttling")  # Speeds up timers
+    options.add_argument("--disable-backgrounding-occluded-windows")
+    options.add_argument("--blink-settings=imagesEnabled=false")  # Disables images for faster loading
+    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36")
+    return options
+
+class PooledDriver:
+    """A Chrome session owned by the pool, with the number of pages it has served"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+class DriverPool:
+    """Pool of warm headless Chrome sessions shared across searches
+
+    The idle list and the count of started sessions share one condition, so
+    a caller waiting for a session wakes up both when one is released and
+    when a discarded one frees room to start another.
+    """
+
+    def __init__(self, size=DRIVER_POOL_SIZE, max_pages=DRIVER_MAX_PAGES):
+        self.size = size
+        self.max_pages = max_pages
+        self._idle = []  # Most recently used session last: it is the warmest
+        self._created = 0
+        self._available = threading.Condition()  # Guards both; notified when a session or a slot frees up
+        self._closed = False
+
+    def _create(self):
+        """Start a new Chrome session"""
+        logger.info("Starting pooled Chrome WebDriver")
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        with span("browser_start"), BROWSER_START_SECONDS.time():
+            service = Service(resolve_driver_path())
+            return PooledDriver(webdriver.Chrome(service=service, options=build_chrome_options()))
+
+    def _is_healthy(self, session):
+        """Check that the browser is still responsive"""
+        try:
+            session.driver.execute_script("return 1")
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding unhealthy Chrome session: {e}")
+            return False
+
+    def _discard(self, session):
+        """Quit a session and free its slot"""
+        try:
+            session.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error quitting Chrome session: {e}")
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def acquire(self, timeout=DRIVER_ACQUIRE_TIMEOUT):
+        """Take a healthy session from the pool, starting one if there is room"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._available:
+                if not self._available.wait_for(lambda: self._idle or self._created < self.size,
+                                                deadline - time.monotonic()):
+                    raise TimeoutError(f"No Chrome session available after {timeout}s")
+                session = self._idle.pop() if self._idle else None
+                if session is None:
+                    self._created += 1
+
+            if session is None:
+                try:
+                    return self._create()
+                except Exception:
+                    with self._available:
+                        self._created -= 1
+                        self._available.notify()
+                    raise
+            if self._is_healthy(session):
+                return session
+            self._discard(session)
+
+    def release(self, session, broken=False):
+        """Return a session to the pool, recycling it once it has served enough pages"""
+        session.pages += 1
+        if broken or self._closed or session.pages >= self.max_pages:
+            self._discard(session)
+            return
+        with self._available:
+            self._idle.append(session)
+            self._available.notify()
+
+    @contextmanager
+    def session(self):
+        """Borrow a driver for the duration of a `with` block"""
+        session = self.acquire()
+        try:
+            yield session.driver
+        except Exception:
+            self.release(session, broken=True)
+            raise
+        else:
+            self.release(session)
+
+    def close(self):
+        """Quit every idle session"""
+        self._closed = True
+        with self._available:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            self._discard(session)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_driver_pool():
+    """Returns the process-wide driver pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+            atexit.register(_pool.close)
+        return _pool
+
+if __name__ == "__main__":
+    # Resolve and cache the chromedriver path ahead of time, e.g. while deploying
+    logging.basicConfig(level=logging.INFO)
+    print(resolve_driver_path())
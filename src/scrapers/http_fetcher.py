@@ -0,0 +1,51 @@
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from constants.constants import HTTP_POOL_SIZE, HTTP_TIMEOUT, BLOCKED_STATUSES
+from scrapers.circuit_breaker import BlockedError
+
+logger = logging.getLogger(__name__)
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Connection": "keep-alive",
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Returns the shared keep-alive session used for plain-HTTP scraping."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(HEADERS)
+            _session = session
+        return _session
+
+def fetch_page(url):
+    """Fetches a search page without a browser and returns its HTML."""
+    logger.info(f"Fetching URL over HTTP: {url}")
+    response = get_session().get(url, timeout=HTTP_TIMEOUT)
+    if response.status_code in BLOCKED_STATUSES:
+        raise BlockedError(f"{url} answered HTTP {response.status_code}")
+    response.raise_for_status()
+    return response.text
+
+async def fetch_page_async(session, url):
+    """Fetches a search page on an aiohttp session (asyncio runtime) and returns its HTML."""
+    logger.info(f"Fetching URL over HTTP: {url}")
+    async with session.get(url) as response:
+        if response.status in BLOCKED_STATUSES:
+            raise BlockedError(f"{url} answered HTTP {response.status}")
+        response.raise_for_status()
+        return await response.text()
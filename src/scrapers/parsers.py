@@ -0,0 +1,232 @@
+"""Listing parsers for Craigslist search pages.
+
+Every backend yields {'title', 'price', 'link'} dicts in page order. The
+fastest installed backend is used (selectolax, then lxml, then
+BeautifulSoup) unless LISTING_PARSER names one.
+
+Check that all installed backends agree with the saved fixtures (run from src/):
+    python -m scrapers.parsers
+"""
+import json
+import logging
+import os
+import sys
+from abc import ABC, abstractmethod
+
+from constants.constants import LISTING_PARSER, FIXTURES_DIR
+
+logger = logging.getLogger(__name__)
+
+NO_PRICE = 'No price listed'
+
+class BaseListingParser(ABC):
+    """Abstract base class for search-result parsers"""
+
+    name = None
+
+    @abstractmethod
+    def iter_listings(self, html):
+        """Yield title, price and link for each listing, in page order.
+
+        Rendered gallery cards are used when present; otherwise the static
+        result list served to clients without JavaScript.
+        """
+        pass
+
+class SoupListingParser(BaseListingParser):
+    """BeautifulSoup with html.parser: slowest, but pure Python"""
+
+    name = "soup"
+
+    def __init__(self):
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+
+    def iter_listings(self, html):
+        soup = self._soup(html, 'html.parser')
+        found_gallery = False
+
+        # Rendered gallery view (Selenium)
+        for listing in soup.find_all('div', class_='cl-search-result cl-search-view-mode-gallery'):
+            try:
+                title_element = listing.find('a', class_='cl-app-anchor text-only posting-title')
+                if not title_element:
+                    continue
+                title = title_element.find('span', class_='label').text.strip()
+
+                price_element = listing.find('span', class_='priceinfo')
+                price = price_element.text.strip() if price_element else NO_PRICE
+
+                link_element = listing.find('a', class_='main singleton')
+                if not link_element:
+                    continue
+                if title and link_element.get('href'):
+                    found_gallery = True
+                    yield {'title': title, 'price': price, 'link': link_element.get('href')}
+            except Exception as e:
+                logger.warning(f"Error extracting details for a listing: {e}")
+
+        if found_gallery:
+            return
+
+        # Static result list served to clients without JavaScript (plain HTTP)
+        for listing in soup.find_all('li', class_='cl-static-search-result'):
+            try:
+                link_element = listing.find('a')
+                if not link_element:
+                    continue
+                title_element = listing.find('div', class_='title')
+                title = title_element.text.strip() if title_element else listing.get('title', '').strip()
+
+                price_element = listing.find('div', class_='price')
+                price = price_element.text.strip() if price_element else NO_PRICE
+                if title and link_element.get('href'):
+                    yield {'title': title, 'price': price, 'link': link_element.get('href')}
+            except Exception as e:
+                logger.warning(f"Error extracting details for a listing: {e}")
+
+def _has_classes(*classes):
+    """XPath predicate matching elements that carry all of `classes`"""
+    return " and ".join(f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')" for cls in classes)
+
+class LxmlListingParser(BaseListingParser):
+    """lxml with precompiled XPath (the CSS selectors below, translated)"""
+
+    name = "lxml"
+
+    def __init__(self):
+        from lxml import etree, html as lxml_html
+        self._parse = lxml_html.fromstring
+        self._gallery = etree.XPath(f"//div[{_has_classes('cl-search-result', 'cl-search-view-mode-gallery')}]")
+        self._gallery_title = etree.XPath(f".//a[{_has_classes('cl-app-anchor', 'text-only', 'posting-title')}]//span[{_has_classes('label')}]")
+        self._gallery_price = etree.XPath(f".//span[{_has_classes('priceinfo')}]")
+        self._gallery_link = etree.XPath(f".//a[{_has_classes('main', 'singleton')}]/@href")
+        self._static = etree.XPath(f"//li[{_has_classes('cl-static-search-result')}]")
+        self._static_link = etree.XPath(".//a/@href")
+        self._static_title = etree.XPath(f".//div[{_has_classes('title')}]")
+        self._static_price = etree.XPath(f".//div[{_has_classes('price')}]")
+
+    @staticmethod
+    def _text(elements):
+        return elements[0].text_content().strip() if elements else None
+
+    def iter_listings(self, html):
+        if not html.strip():
+            return
+        tree = self._parse(html)
+        found_gallery = False
+
+        for listing in self._gallery(tree):
+            title = self._text(self._gallery_title(listing))
+            links = self._gallery_link(listing)
+            if title and links and links[0]:
+                found_gallery = True
+                yield {'title': title, 'price': self._text(self._gallery_price(listing)) or NO_PRICE, 'link': links[0]}
+
+        if found_gallery:
+            return
+
+        for listing in self._static(tree):
+            links = self._static_link(listing)
+            title = self._text(self._static_title(listing)) or (listing.get('title') or '').strip()
+            if title and links and links[0]:
+                yield {'title': title, 'price': self._text(self._static_price(listing)) or NO_PRICE, 'link': links[0]}
+
+class SelectolaxListingParser(BaseListingParser):
+    """selectolax (Lexbor engine) with CSS selectors: fastest"""
+
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parse = LexborHTMLParser
+
+    @staticmethod
+    def _text(node):
+        return node.text(strip=True) if node is not None else None
+
+    def iter_listings(self, html):
+        tree = self._parse(html)
+        found_gallery = False
+
+        for listing in tree.css("div.cl-search-result.cl-search-view-mode-gallery"):
+            title = self._text(listing.css_first("a.cl-app-anchor.text-only.posting-title span.label"))
+            link_node = listing.css_first("a.main.singleton")
+            link = link_node.attributes.get("href") if link_node is not None else None
+            if title and link:
+                found_gallery = True
+                yield {'title': title, 'price': self._text(listing.css_first("span.priceinfo")) or NO_PRICE, 'link': link}
+
+        if found_gallery:
+            return
+
+        for listing in tree.css("li.cl-static-search-result"):
+            link_node = listing.css_first("a")
+            link = link_node.attributes.get("href") if link_node is not None else None
+            title = self._text(listing.css_first("div.title")) or (listing.attributes.get("title") or "").strip()
+            if title and link:
+                yield {'title': title, 'price': self._text(listing.css_first("div.price")) or NO_PRICE, 'link': link}
+
+PARSERS = {parser.name: parser for parser in (SelectolaxListingParser, LxmlListingParser, SoupListingParser)}
+
+def available_parsers():
+    """Every parser backend whose library is installed, fastest first."""
+    parsers = []
+    for parser_class in PARSERS.values():
+        try:
+            parsers.append(parser_class())
+        except ImportError:
+            continue
+    return parsers
+
+_parser = None
+
+def get_parser():
+    """Returns the configured parser, or the fastest installed one for "auto"."""
+    global _parser
+    if _parser is None:
+        if LISTING_PARSER == "auto":
+            parsers = available_parsers()
+            if not parsers:
+                raise ImportError("No HTML parser installed: pip install selectolax, lxml or beautifulsoup4")
+            _parser = parsers[0]
+        else:
+            _parser = PARSERS[LISTING_PARSER]()
+        logger.info(f"Using {_parser.name} listing parser")
+    return _parser
+
+def check_fixtures(fixtures_dir=FIXTURES_DIR):
+    """Parse each saved page with every installed backend and compare against its golden file.
+
+    Returns a list of mismatch descriptions (empty when all backends agree).
+    """
+    mismatches = []
+    parsers = available_parsers()
+    for name in sorted(os.listdir(fixtures_dir)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(fixtures_dir, name), encoding="utf-8") as file:
+            html = file.read()
+        with open(os.path.join(fixtures_dir, name[:-len(".html")] + ".expected.json"), encoding="utf-8") as file:
+            expected = json.load(file)
+        for parser in parsers:
+            actual = list(parser.iter_listings(html))
+            if actual != expected:
+                mismatches.append(f"{parser.name} on {name}: expected {len(expected)} listings, got {actual}")
+    return mismatches
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    installed = [parser.name for parser in available_parsers()]
+    problems = check_fixtures()
+    for problem in problems:
+        print(f"MISMATCH {problem}")
+    if problems:
+        print(f"Checked parsers: {', '.join(installed)}; FAILED")
+        sys.exit(1)
+    if len(installed) < 2:
+        # The point of the check is that backends agree; one (or none) can't be compared
+        print(f"NOT CHECKED: only {len(installed)} parser backend(s) installed ({', '.join(installed) or 'none'}), "
+              "at least 2 are needed. Install the optional ones: pip install selectolax lxml beautifulsoup4")
+        sys.exit(2)
+    print(f"Checked parsers: {', '.join(installed)}; all fixtures match")
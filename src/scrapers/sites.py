@@ -0,0 +1,108 @@
+import difflib
+import json
+import logging
+import re
+import threading
+
+from constants.constants import SITES_FILE, LOCATION_MATCH_CUTOFF
+
+logger = logging.getLogger(__name__)
+
+NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+class UnknownLocationError(ValueError):
+    """The location matches no Craigslist site or sub-area in the catalog"""
+    pass
+
+def normalize_location(text):
+    """Lowercase words with punctuation dropped, so "St. Louis" and "st louis" share a key"""
+    return " ".join(NON_ALPHANUMERIC.split(str(text or "").lower())).strip()
+
+class Location:
+    """A Craigslist subdomain, optionally narrowed to one of its sub-areas"""
+
+    __slots__ = ("code", "area", "name")
+
+    def __init__(self, code, area, name):
+        self.code = code
+        self.area = area
+        self.name = name
+
+    def __eq__(self, other):
+        return isinstance(other, Location) and (self.code, self.area) == (other.code, other.area)
+
+    def __hash__(self):
+        return hash((self.code, self.area))
+
+    def __repr__(self):
+        return f"Location({self.code!r}, {self.area!r}, {self.name!r})"
+
+class SiteCatalog:
+    """Every Craigslist site from the bundled catalog, indexed by name, alias and code
+
+    Site names, aliases and subdomains take precedence over sub-area names, so
+    "San Francisco" means the whole SF Bay Area while "Oakland" narrows it to
+    the East Bay. A sub-area can also be named with its site ("East Bay, SF Bay
+    Area"), which is how resolved sub-areas are displayed and stored.
+    Misspellings are matched to the closest key with difflib.
+    """
+
+    def __init__(self, path=SITES_FILE):
+        with open(path, "r", encoding="utf-8") as file:
+            catalog = json.load(file)
+        self.version = catalog["version"]
+        self.sites = catalog["sites"]
+        self._index = {}
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+        for site in self.sites:
+            location = Location(site["code"], None, site["name"])
+            for key in [site["code"], site["name"], *site.get("aliases", [])]:
+                self._add(key, location)
+        for site in self.sites:
+            for area in site.get("areas", []):
+                location = Location(site["code"], area["code"], f"{area['name']}, {site['name']}")
+                self._add(location.name, location)
+                self._add(f"{site['code']} {area['code']}", location)
+                for key in [area["name"], *area.get("aliases", [])]:
+                    self._add(key, location)
+        self._keys = list(self._index)
+
+    def _add(self, key, location):
+        self._index.setdefault(normalize_location(key), location)
+
+    def __len__(self):
+        return len(self.sites)
+
+    def resolve(self, text):
+        """The Location a free-text place name refers to; raises UnknownLocationError if none is close"""
+        key = normalize_location(text)
+        location = self._index.get(key)
+        if location is not None:
+            return location
+        with self._lock:
+            if key in self._resolved:
+                location = self._resolved[key]
+            else:
+                matches = difflib.get_close_matches(key, self._keys, n=1, cutoff=LOCATION_MATCH_CUTOFF) if key else []
+                location = self._resolved[key] = self._index[matches[0]] if matches else None
+        if location is None:
+            raise UnknownLocationError(f"No Craigslist site matches {text!r}")
+        return location
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_site_catalog():
+    """The site catalog, loaded on first use"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = SiteCatalog()
+            logger.info(f"Loaded {len(_catalog)} Craigslist sites (catalog version {_catalog.version})")
+        return _catalog
+
+def resolve_location(text):
+    """Resolves a location such as "Los Angeles", "oakland" or "Chicgo" to a Craigslist Location"""
+    return get_site_catalog().resolve(text)
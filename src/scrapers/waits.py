@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from constants.constants import PAGE_READY_TIMEOUT, PAGE_READY_SELECTORS, MIN_HOST_INTERVAL
+from metrics.registry import histogram
+from metrics.tracing import span
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_PHASE_SECONDS = histogram("scrape_phase_seconds", "Time per search-page scrape phase", ("phase",))
+SCRAPE_SECONDS = histogram("scrape_seconds", "Total time per search-page scrape, across all phases")
+
+def _results_ready(driver):
+    """Wait condition: true once any result or result-count marker is in the DOM"""
+    from selenium.webdriver.common.by import By
+    for selector in PAGE_READY_SELECTORS:
+        if driver.find_elements(By.CSS_SELECTOR, selector):
+            return True
+    return False
+
+def wait_for_results(driver, timeout=PAGE_READY_TIMEOUT):
+    """Blocks until the search page shows results (or says it has none), up to `timeout` seconds.
+
+    Returns True if the page became ready, False if the timeout was hit.
+    """
+    # Imported here: selenium takes a noticeable share of startup and only browser scrapes need it
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import TimeoutException
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(_results_ready)
+        return True
+    except TimeoutException:
+        logger.warning(f"Search page not ready after {timeout}s: {driver.current_url}")
+        return False
+
+class ScrapeTimer:
+    """Records how long one scrape spends in each phase (fetch, wait, parse, ...)"""
+
+    def __init__(self, url):
+        self.url = url
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        """Time the body of a `with` block under the given phase name"""
+        start = time.perf_counter()
+        try:
+            with span(name, url=self.url):
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            SCRAPE_PHASE_SECONDS.observe(elapsed, phase=name)
+
+    def report(self):
+        """Log the phase breakdown and add it to the running totals"""
+        breakdown = ", ".join(f"{name}={seconds:.2f}s" for name, seconds in self.phases.items())
+        logger.info(f"Scrape timing for {self.url}: {breakdown}")
+        SCRAPE_SECONDS.observe(sum(self.phases.values()))
+        _totals.add(self.phases)
+
+class TimingTotals:
+    """Thread-safe running totals of time spent per scrape phase"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.scrapes = 0
+        self.phases = {}
+
+    def add(self, phases):
+        with self._lock:
+            self.scrapes += 1
+            for name, seconds in phases.items():
+                self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def summary(self):
+        """Average seconds per scrape for each phase"""
+        with self._lock:
+            if not self.scrapes:
+                return {}
+            return {name: seconds / self.scrapes for name, seconds in self.phases.items()}
+
+_totals = TimingTotals()
+
+def get_timing_summary():
+    """Returns the average time per scrape spent in each phase since startup."""
+    return _totals.summary()
+
+_last_request = {}
+_last_request_lock = threading.Lock()
+
+def reserve_host_slot(url, min_interval=MIN_HOST_INTERVAL):
+    """Books the next request slot for the URL's host and returns how many seconds to wait for it."""
+    host = urlparse(url).netloc
+    with _last_request_lock:
+        now = time.monotonic()
+        ready_at = _last_request.get(host, 0.0) + min_interval
+        delay = max(0.0, ready_at - now)
+        _last_request[host] = now + delay
+    return delay
+
+def throttle_host(url, min_interval=MIN_HOST_INTERVAL):
+    """Sleeps only as long as needed to keep `min_interval` seconds between requests to one host."""
+    delay = reserve_host_slot(url, min_interval)
+    if delay:
+        time.sleep(delay)
@@ -0,0 +1,98 @@
+"""Scrape worker: leases search jobs from the job queue, fetches and parses each page, and posts the listings back.
+
+Run from src/, on this machine or any other that can reach JOB_QUEUE_FILE:
+    python -m scrapers.worker                  # SCRAPE_WORKERS processes
+    python -m scrapers.worker --processes 4
+
+The bot must run with SEARCH_EXECUTION=queue. Workers hold no user data:
+matching, dedup and notifications stay in the bot process, and so does the
+circuit breaker, which learns each job's outcome from the queue. Requests to
+a subdomain are spaced MIN_HOST_INTERVAL apart across all workers.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+
+# Load environment variables before importing modules that read settings from them
+load_dotenv()
+
+from constants.constants import SCRAPE_WORKERS, JOB_POLL_SECONDS, MIN_HOST_INTERVAL
+from scrapers import craigslist
+from scrapers.circuit_breaker import BlockedError
+from services.job_queue import JobQueue
+from metrics.registry import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+JOBS_RUN = counter("worker_jobs_total", "Search jobs run by this worker, by outcome", ("outcome",))
+JOB_SECONDS = histogram("worker_job_seconds", "Time to fetch and parse one search job")
+
+def run_job(queue, job, worker):
+    """Fetch and parse one leased job and report the outcome to the queue"""
+    url = job.payload["url"]
+
+    def throttle(page_url):
+        delay = queue.reserve_host_slot(urlparse(page_url).netloc, MIN_HOST_INTERVAL)
+        if delay:
+            time.sleep(delay)
+
+    try:
+        with JOB_SECONDS.time():
+            listings = craigslist.scrape_pages(url, stop_at=job.payload.get("stop_at"), throttle=throttle)
+    except BlockedError as e:
+        # Not retried: the bot's circuit breaker decides when the subdomain is tried again
+        logger.warning(f"Job {job.id} ({url}) was blocked: {e}")
+        JOBS_RUN.inc(outcome="blocked")
+        queue.fail(job.id, worker, e, retry=False, result={"blocked": True})
+        return
+    except Exception as e:
+        logger.warning(f"Job {job.id} ({url}) failed on attempt {job.attempts}: {e}")
+        JOBS_RUN.inc(outcome="failed")
+        queue.fail(job.id, worker, e)
+        return
+    if queue.complete(job.id, worker, {"listings": listings}):
+        JOBS_RUN.inc(outcome="done")
+    else:
+        logger.warning(f"Job {job.id} ({url}) finished after its lease expired; result dropped")
+        JOBS_RUN.inc(outcome="expired")
+
+def run_worker(index=0):
+    """Worker process main loop: lease, run, repeat"""
+    logging.basicConfig(level=logging.INFO, format=f'%(asctime)s - worker {index} - %(name)s - %(levelname)s - %(message)s')
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    queue = JobQueue()
+    logger.info(f"Scrape worker {worker} started")
+    while True:
+        job = queue.lease(worker)
+        if job is None:
+            time.sleep(JOB_POLL_SECONDS)
+            continue
+        run_job(queue, job, worker)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run scrape worker processes for the job queue")
+    parser.add_argument("--processes", type=int, default=SCRAPE_WORKERS)
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_worker()
+        return
+
+    processes = [multiprocessing.Process(target=run_worker, args=(index,), name=f"scrape-worker-{index}")
+                 for index in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+if __name__ == "__main__":
+    main()
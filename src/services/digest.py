@@ -0,0 +1,140 @@
+# services/digest.py
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from constants.constants import TELEGRAM_MESSAGE_LIMIT, DIGEST_MAX_PAGINATIONS
+from services.match_engine import parse_price
+
+logger = logging.getLogger(__name__)
+
+IMMEDIATE = 0  # digest_minutes value for immediate delivery
+
+def format_listing(result):
+    """One listing as it appears in a message"""
+    return f"{result['title']}\n{result['price']}\n{result['link']}"
+
+def _price_key(result):
+    price = result.get('price_value', parse_price(result['price']))
+    return (price is None, price or 0)
+
+TRUNCATED = "\n[truncated]"  # Marks a listing cut to fit one message
+
+def _truncate(text, room):
+    """`text` cut to `room` characters, ending in TRUNCATED if anything was cut"""
+    if len(text) <= room:
+        return text
+    return text[:max(room - len(TRUNCATED), 0)] + TRUNCATED
+
+def build_digest_pages(results, header, limit=TELEGRAM_MESSAGE_LIMIT):
+    """Packs listings into as few messages as fit Telegram's length limit.
+
+    Listings are grouped by filter and sorted by price (unpriced last). A group
+    that runs over a page break repeats its header, marked "(cont.)", and a
+    listing too long for any message is cut with a TRUNCATED marker.
+    """
+    groups = OrderedDict()
+    for result in results:
+        groups.setdefault((result['search_item'], result['search_location']), []).append(result)
+
+    pages = []
+    current = header
+    for (item, location), group in groups.items():
+        group_header = f"\n\n== {item} in {location} =="
+        for index, result in enumerate(sorted(group, key=_price_key)):
+            entry = format_listing(result)
+            block = (group_header if index == 0 else "") + "\n\n" + entry
+            if len(current) + len(block) <= limit:
+                current += block
+            elif current == header:
+                # Nothing on this page yet, so a new one wouldn't have more room
+                current += _truncate(block, limit - len(current))
+            else:
+                pages.append(current)
+                # Repeat the group header at the top of the new page
+                page_header = f"== {item} in {location}{' (cont.)' if index else ''} ==\n\n"
+                current = page_header + _truncate(entry, limit - len(page_header))
+    pages.append(current)
+    return pages
+
+class DigestService:
+    """Delivers search results as packed digests, immediately or every N minutes per user
+
+    Results waiting for a scheduled digest are kept in `store` (a DigestStore),
+    so they survive a restart.
+    """
+
+    def __init__(self, messenger, settings, store):
+        self.messenger = messenger
+        self.settings = settings
+        self.store = store
+        self._lock = threading.Lock()
+        # chat_id -> time of the last scheduled digest; after a restart, when its oldest pending listing was queued
+        self._last_sent = store.chats()
+        self._more_pages = OrderedDict()  # token -> (chat_id, [remaining pages])
+        self._tokens = itertools.count(1)
+
+    def get_interval(self, chat_id):
+        """Digest interval in minutes for a user; 0 means immediate delivery"""
+        return self.settings.get(chat_id, "digest_minutes", IMMEDIATE)
+
+    def set_interval(self, chat_id, minutes):
+        self.settings.set(chat_id, "digest_minutes", minutes)
+
+    def deliver(self, chat_id, results, header):
+        """Send results now, or hold them for the user's next scheduled digest"""
+        if not results:
+            return
+        if self.get_interval(chat_id) == IMMEDIATE:
+            self.send_now(chat_id, results, header)
+            return
+        self.store.add(chat_id, header, results)
+        with self._lock:
+            self._last_sent.setdefault(chat_id, time.time())
+
+    def flush_due(self):
+        """Send every pending digest whose interval has elapsed"""
+        now = time.time()
+        due = []
+        with self._lock:
+            for chat_id in self.store.chats():
+                interval = self.get_interval(chat_id) * 60
+                if now - self._last_sent.get(chat_id, 0) >= interval:
+                    due.append(chat_id)
+                    self._last_sent[chat_id] = now
+        for chat_id in due:
+            header, results, last_id = self.store.pending(chat_id)
+            if results:
+                self.send_now(chat_id, results, header)
+                # Removed only once sent, so a crash in between sends them again rather than losing them
+                self.store.remove(chat_id, last_id)
+
+    def send_now(self, chat_id, results, header):
+        """Send the first digest page, with a "more" button if there are further pages"""
+        pages = build_digest_pages(results, header)
+        logger.info(f"Sending {len(results)} listings to {chat_id} in {len(pages)} message(s)")
+        self._send_page(chat_id, pages)
+
+    def _send_page(self, chat_id, pages):
+        page, remaining = pages[0], pages[1:]
+        if not remaining:
+            self.messenger.send_message(chat_id, page)
+            return
+        with self._lock:
+            token = str(next(self._tokens))
+            self._more_pages[token] = (chat_id, remaining)
+            while len(self._more_pages) > DIGEST_MAX_PAGINATIONS:
+                self._more_pages.popitem(last=False)
+        button = {"text": f"More ({len(remaining)} more page{'s' if len(remaining) > 1 else ''})", "callback_data": f"digest_more_{token}"}
+        self.messenger.send_buttons(chat_id, page, [[button]])
+
+    def send_more(self, chat_id, token):
+        """Send the next page for a "more" button press"""
+        with self._lock:
+            entry = self._more_pages.pop(token, None)
+        if entry is None or entry[0] != chat_id:
+            self.messenger.send_message(chat_id, "Those listings are no longer available.")
+            return
+        self._send_page(chat_id, entry[1])
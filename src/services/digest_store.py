@@ -0,0 +1,58 @@
+# services/digest_store.py
+import json
+import sqlite3
+import threading
+import time
+
+from constants.constants import SEEN_DB_FILE
+
+class DigestStore:
+    """Listings held for users' scheduled digests, persisted in SQLite next to the seen listings
+
+    Listings are marked as seen when they are queued for a digest, so they
+    stay on disk until the digest has been handed to the messenger; a bot
+    restarted within the digest window sends them instead of dropping them.
+    """
+
+    def __init__(self, db_file=SEEN_DB_FILE):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending_digests ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, chat_id INTEGER NOT NULL, header TEXT NOT NULL, "
+            "result TEXT NOT NULL, added_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pending_digests_chat_idx ON pending_digests (chat_id, id)")
+        self._conn.commit()
+
+    def add(self, chat_id, header, results):
+        """Queue results for the chat's next digest"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO pending_digests (chat_id, header, result, added_at) VALUES (?, ?, ?, ?)",
+                [(chat_id, header, json.dumps(result), now) for result in results])
+            self._conn.commit()
+
+    def chats(self):
+        """{chat_id: time its oldest pending listing was queued}"""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT chat_id, MIN(added_at) FROM pending_digests GROUP BY chat_id").fetchall())
+
+    def pending(self, chat_id):
+        """(header, results, last ID) for the chat's queued listings, oldest first; results is empty if there are none"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, header, result FROM pending_digests WHERE chat_id = ? ORDER BY id", (chat_id,)).fetchall()
+        if not rows:
+            return None, [], None
+        return rows[0][1], [json.loads(row[2]) for row in rows], rows[-1][0]
+
+    def remove(self, chat_id, last_id):
+        """Drop the chat's queued listings up to and including `last_id`, once they have been sent"""
+        with self._lock:
+            self._conn.execute("DELETE FROM pending_digests WHERE chat_id = ? AND id <= ?", (chat_id, last_id))
+            self._conn.commit()
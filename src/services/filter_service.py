@@ -1,15 +1,81 @@
 # services/filter_service.py
+import copy
 import json
 import os
+import tempfile
+import threading
 
-class FilterService:
-    """Service for managing filters"""
+from storage.base import BaseFilterStore
+
+def _price_digits(text):
+    return "".join(ch for ch in text if ch.isdigit())
+
+def normalize_filter(filter_data):
+    """Returns the filter in the current schema, filling in fields older filters lack.
+    
+    Schema: item, location, price (maximum, digits or ""), min_price (digits or ""),
+    include and exclude (lists of keywords the listing title must / must not contain).
+    Shorthand typed into the bot is expanded: a price of "100-500" sets both bounds,
+    and item words prefixed with "+" or "-" become include or exclude keywords.
+    """
+    normalized = dict(filter_data)
+    include = list(normalized.get("include") or [])
+    exclude = list(normalized.get("exclude") or [])
+    
+    item_words = []
+    for word in str(normalized.get("item", "")).split():
+        if word.startswith("+") and len(word) > 1:
+            include.append(word[1:].lower())
+        elif word.startswith("-") and len(word) > 1:
+            exclude.append(word[1:].lower())
+        else:
+            item_words.append(word)
+    normalized["item"] = " ".join(item_words)
+    
+    price = str(normalized.get("price") or "").strip()
+    if "-" in price:
+        low, _, high = price.partition("-")
+        normalized["min_price"] = normalized.get("min_price") or _price_digits(low)
+        price = high
+    normalized["price"] = _price_digits(price) if any(ch.isdigit() for ch in price) else price
+    normalized["min_price"] = str(normalized.get("min_price") or "")
+    normalized["include"] = list(dict.fromkeys(include))
+    normalized["exclude"] = list(dict.fromkeys(exclude))
+    normalized.setdefault("location", "")
+    return normalized
+
+class FilterService(BaseFilterStore):
+    """Service for managing filters
+    
+    Filters are kept in memory and reloaded only when the file's mtime changes.
+    Writes go through to disk atomically.
+    """
     
     def __init__(self, filters_file):
         self.filters_file = filters_file
+        self._lock = threading.RLock()
+        self._filters = None
+        self._mtime = None
     
-    def load_filters(self):
-        """Load filters from the JSON file"""
+    def _file_mtime(self):
+        try:
+            return os.stat(self.filters_file).st_mtime_ns
+        except FileNotFoundError:
+            return None
+    
+    def _cached_filters(self):
+        """Return the in-memory filters, reloading them if the file changed on disk"""
+        with self._lock:
+            mtime = self._file_mtime()
+            if self._filters is None or mtime != self._mtime:
+                self._filters = {
+                    user_id: [normalize_filter(f) for f in filters]
+                    for user_id, filters in self._read_file().items()
+                }
+                self._mtime = mtime
+            return self._filters
+    
+    def _read_file(self):
         try:
             if os.path.exists(self.filters_file):
                 with open(self.filters_file, "r") as file:
@@ -18,49 +84,71 @@ class FilterService:
         except json.JSONDecodeError:
             return {}
     
+    def load_filters(self):
+        """Load filters from the JSON file"""
+        with self._lock:
+            return copy.deepcopy(self._cached_filters())
+    
     def save_filters(self, filters_data):
         """Save filters to the JSON file"""
-        with open(self.filters_file, "w") as file:
-            json.dump(filters_data, file, indent=4)
+        with self._lock:
+            # Write to a temp file in the same directory, then rename over the original
+            directory = os.path.dirname(os.path.abspath(self.filters_file))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".filters-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as file:
+                    json.dump(filters_data, file, indent=4)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(tmp_path, self.filters_file)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._filters = filters_data
+            self._mtime = self._file_mtime()
     
     def get_user_filters(self, user_id):
         """Get all filters for a specific user"""
-        filters_data = self.load_filters()
-        return filters_data.get(user_id, [])
+        with self._lock:
+            return copy.deepcopy(self._cached_filters().get(user_id, []))
     
     def add_filter(self, user_id, filter_data):
         """Add a new filter for a user"""
-        filters_data = self.load_filters()
-        
-        if user_id not in filters_data:
-            filters_data[user_id] = []
-        
-        filters_data[user_id].append(filter_data)
-        self.save_filters(filters_data)
-        return True
+        with self._lock:
+            filters_data = self.load_filters()
+            
+            if user_id not in filters_data:
+                filters_data[user_id] = []
+            
+            filters_data[user_id].append(normalize_filter(filter_data))
+            self.save_filters(filters_data)
+            return True
     
     def update_filter(self, user_id, filter_index, filter_data):
         """Update an existing filter"""
-        filters_data = self.load_filters()
-        
-        if user_id not in filters_data or filter_index >= len(filters_data[user_id]):
-            return False
-        
-        filters_data[user_id][filter_index] = filter_data
-        self.save_filters(filters_data)
-        return True
+        with self._lock:
+            filters_data = self.load_filters()
+            
+            if user_id not in filters_data or filter_index >= len(filters_data[user_id]):
+                return False
+            
+            filters_data[user_id][filter_index] = normalize_filter(filter_data)
+            self.save_filters(filters_data)
+            return True
     
     def delete_filter(self, user_id, filter_index):
         """Delete a filter"""
-        filters_data = self.load_filters()
-        
-        if user_id not in filters_data or filter_index >= len(filters_data[user_id]):
-            return False
-        
-        del filters_data[user_id][filter_index]
-        self.save_filters(filters_data)
-        return True
+        with self._lock:
+            filters_data = self.load_filters()
+            
+            if user_id not in filters_data or filter_index >= len(filters_data[user_id]):
+                return False
+            
+            del filters_data[user_id][filter_index]
+            self.save_filters(filters_data)
+            return True
     
     def get_all_users(self):
-        filters_data = self.load_filters()
-        return filters_data.keys()
\ No newline at end of file
+        with self._lock:
+            return list(self._cached_filters().keys())
\ No newline at end of file
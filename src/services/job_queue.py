@@ -0,0 +1,206 @@
+# services/job_queue.py
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from constants.constants import JOB_QUEUE_FILE, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_RETRY_DELAY, SEARCH_PER_HOST_LIMIT
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+class Job:
+    """One row of the job queue"""
+
+    __slots__ = ("id", "payload", "attempts", "status", "result", "error")
+
+    def __init__(self, id, payload, attempts=0, status=QUEUED, result=None, error=None):
+        self.id = id
+        self.payload = payload
+        self.attempts = attempts
+        self.status = status
+        self.result = result
+        self.error = error
+
+    def __repr__(self):
+        return f"Job({self.id}, {self.status}, attempt {self.attempts})"
+
+class JobQueue:
+    """Search jobs shared between the bot and scrape worker processes, in a WAL-mode SQLite database
+
+    The bot enqueues a JSON payload per search, tagged with the Craigslist
+    subdomain it targets. A worker leases the oldest available job whose
+    subdomain has fewer than `host_limit` jobs leased, for `lease_seconds`,
+    and reports it done, with a JSON result, or failed. A failed job is
+    retried after a growing delay until it has been tried `max_attempts`
+    times. A job whose lease runs out (its worker died or hung) is handed to
+    the next worker that asks. The bot collects finished jobs, which removes
+    them from the queue. Workers also book their requests through
+    `reserve_host_slot`, which spaces requests to a subdomain across every
+    worker process.
+
+    Each process opens its own connection; leases are taken in an immediate
+    transaction so two workers never get the same job.
+    """
+
+    def __init__(self, db_file=JOB_QUEUE_FILE, lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS,
+                 retry_delay=JOB_RETRY_DELAY, host_limit=SEARCH_PER_HOST_LIMIT):
+        self.host_limit = host_limit
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, host TEXT, payload TEXT NOT NULL, status TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL, lease_expires REAL, worker TEXT, "
+            "result TEXT, error TEXT, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, available_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS hosts (host TEXT PRIMARY KEY, next_request_at REAL NOT NULL)")
+
+    def enqueue(self, payload, host=None):
+        """Adds a job for `host` and returns its ID"""
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                "INSERT INTO jobs (host, payload, status, available_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (host, json.dumps(payload), QUEUED, now, now)).lastrowid
+
+    def lease(self, worker):
+        """Claims the oldest available job for `worker`, or returns None if there is none"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._reclaim_expired(now)
+                leased = dict(self._conn.execute(
+                    "SELECT host, COUNT(*) FROM jobs WHERE status = ? GROUP BY host", (LEASED,)).fetchall())
+                # The oldest job whose subdomain has a free slot
+                row = None
+                for candidate in self._conn.execute(
+                        "SELECT id, host, payload, attempts FROM jobs WHERE status = ? AND available_at <= ? "
+                        "ORDER BY available_at, id", (QUEUED, now)):
+                    if candidate[1] is None or leased.get(candidate[1], 0) < self.host_limit:
+                        row = candidate
+                        break
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                job_id, _, payload, attempts = row
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = ?, lease_expires = ?, worker = ? WHERE id = ?",
+                    (LEASED, attempts + 1, now + self.lease_seconds, worker, job_id))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return Job(job_id, json.loads(payload), attempts + 1, LEASED)
+
+    def _reclaim_expired(self, now):
+        """Requeue jobs whose worker's lease ran out, or fail them if they are out of attempts"""
+        expired = self._conn.execute(
+            "SELECT id, attempts, worker FROM jobs WHERE status = ? AND lease_expires < ?", (LEASED, now)).fetchall()
+        for job_id, attempts, worker in expired:
+            logger.warning(f"Lease on job {job_id} held by {worker} expired")
+            self._retry_or_fail(job_id, attempts, f"lease held by {worker} expired", now)
+
+    def _retry_or_fail(self, job_id, attempts, error, now):
+        if attempts < self.max_attempts:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, lease_expires = NULL, worker = NULL, error = ? WHERE id = ?",
+                (QUEUED, now + self.retry_delay * attempts, error, job_id))
+        else:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, lease_expires = NULL, error = ? WHERE id = ?", (FAILED, error, job_id))
+
+    def complete(self, job_id, worker, result):
+        """Stores a leased job's result; returns False if the lease had already passed to another worker"""
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, lease_expires = NULL WHERE id = ? AND status = ? AND worker = ?",
+                (DONE, json.dumps(result), job_id, LEASED, worker)).rowcount
+        return bool(updated)
+
+    def fail(self, job_id, worker, error, retry=True, result=None):
+        """Reports a leased job as failed; it is queued again unless `retry` is False or it is out of attempts
+
+        `result` is kept with a job that is not retried, for the bot to read (e.g. whether it was blocked).
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT attempts FROM jobs WHERE id = ? AND status = ? AND worker = ?",
+                    (job_id, LEASED, worker)).fetchone()
+                if row is not None:
+                    self._retry_or_fail(job_id, row[0] if retry else self.max_attempts, str(error), now)
+                    if result is not None:
+                        self._conn.execute("UPDATE jobs SET result = ? WHERE id = ? AND status = ?",
+                                           (json.dumps(result), job_id, FAILED))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def collect(self, job_ids=None):
+        """Removes and returns finished (done or failed) jobs, optionally only those in `job_ids`"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, payload, attempts, status, result, error FROM jobs WHERE status IN (?, ?)",
+                    (DONE, FAILED)).fetchall()
+                if job_ids is not None:
+                    rows = [row for row in rows if row[0] in job_ids]
+                self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(row[0],) for row in rows])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [Job(job_id, json.loads(payload), attempts, status, json.loads(result) if result else None, error)
+                for job_id, payload, attempts, status, result, error in rows]
+
+    def cancel(self, job_id):
+        """Drops a job that no worker has started; returns False if it is already leased or finished"""
+        with self._lock:
+            return bool(self._conn.execute(
+                "DELETE FROM jobs WHERE id = ? AND status = ?", (job_id, QUEUED)).rowcount)
+
+    def reserve_host_slot(self, host, min_interval):
+        """Books the next request slot for `host` across all workers and returns how many seconds to wait for it"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT next_request_at FROM hosts WHERE host = ?", (host,)).fetchone()
+                start = max(now, row[0]) if row else now
+                self._conn.execute("INSERT OR REPLACE INTO hosts VALUES (?, ?)", (host, start + min_interval))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return start - now
+
+    def purge(self):
+        """Drops every job, e.g. ones left behind by a previous bot process; returns how many"""
+        with self._lock:
+            return self._conn.execute("DELETE FROM jobs").rowcount
+
+    def counts(self):
+        """{status: number of jobs}"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,110 @@
+import bisect
+import re
+from collections import defaultdict
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def parse_price(price):
+    """Converts a price string such as "$1,200" or "500" to an integer, or None if it has no digits."""
+    digits = ''.join(ch for ch in str(price or '') if ch.isdigit())
+    return int(digits) if digits else None
+
+def tokenize(text):
+    """Lowercase alphanumeric words of a title or keyword"""
+    return set(TOKEN_PATTERN.findall(str(text).lower()))
+
+class CompiledFilter:
+    """One subscriber's filter, reduced to integer bounds and keyword token sets"""
+
+    __slots__ = ("index", "user_id", "search_params", "min_price", "max_price", "required", "excluded")
+
+    def __init__(self, index, user_id, search_params):
+        self.index = index
+        self.user_id = user_id
+        self.search_params = search_params
+        self.min_price = parse_price(search_params.get('min_price'))
+        self.max_price = parse_price(search_params.get('price'))
+        self.required = set()
+        for keyword in search_params.get('include') or []:
+            self.required |= tokenize(keyword)
+        # A multi-word exclusion ("for parts") excludes only titles containing all of its words
+        self.excluded = [tokens for tokens in (tokenize(keyword) for keyword in search_params.get('exclude') or []) if tokens]
+
+    @property
+    def priced(self):
+        return self.min_price is not None or self.max_price is not None
+
+    def price_ok(self, price):
+        """Listings without a price only match filters with no price bounds"""
+        if price is None:
+            return not self.priced
+        if self.min_price is not None and price < self.min_price:
+            return False
+        return self.max_price is None or price <= self.max_price
+
+class MatchIndex:
+    """Matches listings against many filters at once
+
+    Filters that require keywords are reached through an inverted index from
+    title word to filter, so a listing only visits filters whose keywords it
+    could satisfy. Filters without keywords are kept sorted by maximum price
+    and found by bisection. Exclusions are indexed the same way.
+    """
+
+    def __init__(self, subscriptions):
+        self.filters = [CompiledFilter(index, user_id, params) for index, (user_id, params) in enumerate(subscriptions)]
+        self._required_by_token = defaultdict(list)
+        self._excluded_by_token = defaultdict(list)
+        unkeyed = []
+        for compiled in self.filters:
+            for token in compiled.required:
+                self._required_by_token[token].append(compiled)
+            for tokens in compiled.excluded:
+                self._excluded_by_token[min(tokens)].append((compiled.index, tokens))
+            if not compiled.required:
+                unkeyed.append(compiled)
+
+        # Keyword-free filters: unbounded ones match every listing; bounded ones are sorted by max price
+        self._open = [compiled for compiled in unkeyed if not compiled.priced]
+        bounded = sorted((compiled for compiled in unkeyed if compiled.priced),
+                         key=lambda compiled: float("inf") if compiled.max_price is None else compiled.max_price)
+        self._bounded = bounded
+        self._bounded_max = [float("inf") if compiled.max_price is None else compiled.max_price for compiled in bounded]
+
+    def __len__(self):
+        return len(self.filters)
+
+    def _candidates(self, tokens, price):
+        """Filters whose keywords and price bounds the listing satisfies, before exclusions"""
+        candidates = list(self._open)
+        if price is not None:
+            start = bisect.bisect_left(self._bounded_max, price)
+            candidates.extend(compiled for compiled in self._bounded[start:]
+                              if compiled.min_price is None or price >= compiled.min_price)
+
+        hits = defaultdict(int)
+        for token in tokens:
+            for compiled in self._required_by_token.get(token, ()):
+                hits[compiled] += 1
+        candidates.extend(compiled for compiled, count in hits.items()
+                          if count == len(compiled.required) and compiled.price_ok(price))
+        return candidates
+
+    def match_listing(self, listing):
+        """Indexes of the filters a single listing matches"""
+        tokens = tokenize(listing['title'])
+        excluded = set()
+        for token in tokens:
+            for index, phrase in self._excluded_by_token.get(token, ()):
+                if phrase <= tokens:
+                    excluded.add(index)
+        return [compiled.index for compiled in self._candidates(tokens, parse_price(listing['price']))
+                if compiled.index not in excluded]
+
+    def match(self, listings):
+        """Matches a page of listings in one pass; returns one list of listings per filter, in page order"""
+        matched = [[] for _ in self.filters]
+        for listing in listings:
+            for index in self.match_listing(listing):
+                matched[index].append(listing)
+        return matched
@@ -0,0 +1,156 @@
+import heapq
+import logging
+import random
+import threading
+import time
+
+from scrapers.circuit_breaker import host_retry_in
+from metrics.registry import counter, gauge
+from constants.constants import (
+    SEARCH_INTERVAL_MINUTES, SEARCH_MIN_INTERVAL_MINUTES, SEARCH_MAX_INTERVAL_MINUTES,
+    SEARCH_INTERVAL_BACKOFF, SEARCH_INTERVAL_JITTER
+)
+
+logger = logging.getLogger(__name__)
+
+POLL_RUNS = counter("poll_runs_total", "Scheduled query runs started")
+POLL_SKIPS = counter("poll_skips_total", "Scheduled query runs held back", ("reason",))
+
+class ScheduledQuery:
+    """Polling state of one distinct query"""
+
+    def __init__(self, plan, interval, next_due):
+        self.plan = plan
+        self.interval = interval
+        self.next_due = next_due
+        self.in_flight = False
+
+class PollScheduler:
+    """Decides when each distinct query is scraped next
+
+    Queries sit in a heap ordered by next-due time. A query that keeps
+    producing new listings is polled more often (down to `min_interval`);
+    one that produces nothing backs off (up to `max_interval`). Every
+    interval is jittered so queries added together drift apart instead of
+    coming due in bursts. Jobs are QueryPlans (or anything with `key`, `host` and
+    `new_listings`); all times are in seconds on the monotonic clock.
+
+    Queries on a subdomain whose circuit breaker is open are held back until
+    it is ready for a probe, so healthy subdomains keep their slots.
+    """
+
+    def __init__(self, interval=SEARCH_INTERVAL_MINUTES * 60, min_interval=SEARCH_MIN_INTERVAL_MINUTES * 60,
+                 max_interval=SEARCH_MAX_INTERVAL_MINUTES * 60, backoff=SEARCH_INTERVAL_BACKOFF,
+                 jitter=SEARCH_INTERVAL_JITTER, host_retry_in=host_retry_in):
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.host_retry_in = host_retry_in
+        self._lock = threading.Lock()
+        self._heap = []  # (next_due, key); entries whose time no longer matches the query are stale
+        self._queries = {}
+        gauge("poll_queries", "Distinct queries being polled").set_function(self.__len__)
+        gauge("poll_queries_in_flight", "Scheduled query runs in progress").set_function(self.in_flight)
+
+    def _jittered(self, interval):
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _push(self, query, next_due):
+        query.next_due = next_due
+        heapq.heappush(self._heap, (next_due, query.plan.key))
+
+    def sync(self, plans, now=None):
+        """Track exactly these queries, keeping the polling state of ones already known.
+
+        New queries are spread evenly over one base interval rather than all
+        coming due at once.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            current = {plan.key: plan for plan in plans}
+            for key in self._queries.keys() - current.keys():
+                del self._queries[key]
+
+            added = []
+            for key, plan in current.items():
+                if key in self._queries:
+                    self._queries[key].plan = plan  # Picks up subscriber changes
+                else:
+                    added.append(plan)
+
+            for i, plan in enumerate(added):
+                query = self._queries[plan.key] = ScheduledQuery(plan, self.interval, now)
+                self._push(query, now + self.interval * (i + random.random()) / len(added))
+            if added:
+                logger.info(f"Scheduled {len(added)} new queries over the next {self.interval / 60:.0f} minutes")
+
+    def pop_due(self, now=None):
+        """Plans that are due, marked in flight; call `complete(plan)` when each one finishes.
+
+        A query whose previous run is still in flight is skipped until its next slot.
+        """
+        now = time.monotonic() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                next_due, key = heapq.heappop(self._heap)
+                query = self._queries.get(key)
+                if query is None or query.next_due != next_due:
+                    continue
+                cooling_down = self.host_retry_in(query.plan.host)
+                if cooling_down:
+                    POLL_SKIPS.inc(reason="circuit_open")
+                    self._push(query, now + cooling_down + random.uniform(0, self.jitter * query.interval))
+                    continue
+                self._push(query, now + self._jittered(query.interval))
+                if query.in_flight:
+                    logger.warning(f"Previous run of {key} still in flight, skipping this one")
+                    POLL_SKIPS.inc(reason="in_flight")
+                    continue
+                query.in_flight = True
+                due.append(query.plan)
+        POLL_RUNS.inc(len(due))
+        return due
+
+    def complete(self, plan):
+        """Record a finished run and adapt the query's interval to whether it found anything new"""
+        with self._lock:
+            query = self._queries.get(plan.key)
+            if query is None:
+                return
+            query.in_flight = False
+            new_listings = getattr(plan, "new_listings", None)
+            if new_listings is None:  # Failed, or no high-water mark yet to count against
+                return
+
+            if new_listings:
+                interval = max(self.min_interval, query.interval / self.backoff)
+            else:
+                interval = min(self.max_interval, query.interval * self.backoff)
+            if interval != query.interval:
+                logger.info(f"Polling {plan.key} every {interval / 60:.1f} minutes ({new_listings} new)")
+            query.interval = interval
+
+            # Bring the next run forward if the query just got hotter
+            next_due = time.monotonic() + self._jittered(interval)
+            if next_due < query.next_due:
+                self._push(query, next_due)
+
+    def seconds_until_next(self, now=None):
+        """Seconds until the next query comes due, or None if nothing is scheduled"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - now)
+
+    def in_flight(self):
+        """Number of queries currently being run"""
+        with self._lock:
+            return sum(query.in_flight for query in self._queries.values())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._queries)
@@ -0,0 +1,135 @@
+# services/query_planner.py
+import logging
+from urllib.parse import urlparse
+
+from scrapers import craigslist
+from scrapers.sites import UnknownLocationError
+from services.seen_store import get_seen_store
+from services.match_engine import MatchIndex, parse_price
+from metrics.registry import histogram
+from metrics.tracing import span
+
+logger = logging.getLogger(__name__)
+
+QUERY_SECONDS = histogram("query_seconds", "Time to scrape one distinct query and fan it out")
+FAN_OUT_SECONDS = histogram("fan_out_seconds", "Time to match, dedup and save one query's listings for its subscribers")
+
+def normalize_item(item):
+    """Lowercases an item and collapses whitespace so equivalent searches share a key"""
+    return " ".join(item.lower().split())
+
+def query_key(search_params):
+    """Canonical key for a search: its URL without the price limit."""
+    return craigslist.build_search_url({
+        'item': normalize_item(search_params['item']),
+        'location': search_params['location'],
+        'price': ''
+    })
+
+class QueryPlan:
+    """One distinct Craigslist search and every (user, filter) subscribed to it"""
+
+    def __init__(self, key, search_params, incremental=True):
+        self.key = key
+        self.incremental = incremental
+        self.search_params = dict(search_params, item=normalize_item(search_params['item']))
+        self.subscribers = []
+        self._match_index = None
+        self.watermark = None
+        self._newest = None  # Newest posting ID of the last run, until advance_watermark records it
+        self.new_listings = None  # Listings past the high-water mark on the last run; None without one
+
+    def add_subscriber(self, user_id, search_params):
+        self.subscribers.append((user_id, search_params))
+        self._match_index = None
+
+    @property
+    def match_index(self):
+        """Every subscriber's price and keyword filter, compiled once per plan"""
+        if self._match_index is None:
+            self._match_index = MatchIndex(self.subscribers)
+        return self._match_index
+
+    @property
+    def max_price(self):
+        """Loosest price limit across subscribers; None if any subscriber has no limit"""
+        limits = [parse_price(params['price']) for _, params in self.subscribers]
+        if not limits or None in limits:
+            return None
+        return max(limits)
+
+    @property
+    def url(self):
+        max_price = self.max_price
+        return craigslist.build_search_url(dict(self.search_params, price=str(max_price) if max_price is not None else ''))
+
+    @property
+    def host(self):
+        return urlparse(self.key).netloc
+
+    def stop_at(self):
+        """Posting ID to stop parsing at: the query's high-water mark, or None for a full scrape"""
+        # Keyed by the exact URL, since a looser price limit can surface older postings
+        self.watermark = get_seen_store().get_watermark(self.url) if self.incremental else None
+        self._newest = None
+        self.new_listings = None
+        return self.watermark
+
+    def run(self):
+        """Scrape once and fan the listings out to every subscriber that hasn't seen them yet.
+
+        Returns a list of (user_id, search_params, results) tuples.
+        """
+        url = self.url
+        logger.info(f"Searching {url} for {len(self.subscribers)} subscriber(s)")
+        with span("query", url=url), QUERY_SECONDS.time():
+            return self.fan_out(craigslist.fetch_listings(url, stop_at=self.stop_at()))
+
+    def fan_out(self, listings):
+        """Match already-fetched listings against each subscriber and record what was new"""
+        if self.watermark is not None:
+            self.new_listings = len(listings)
+        # The mark is shared by every subscriber of the URL, so a full scrape for one
+        # user's immediate search never moves it; see advance_watermark
+        numbers = [n for n in (craigslist.posting_number(listing['link']) for listing in listings) if n is not None]
+        self._newest = max(numbers) if numbers and self.incremental else None
+
+        with span("fan_out", subscribers=len(self.subscribers)), FAN_OUT_SECONDS.time():
+            fanned_out = []
+            for (user_id, search_params), matched in zip(self.subscribers, self.match_index.match(listings)):
+                new_listings = craigslist.filter_new_listings(matched, user_id)
+                results = craigslist.build_results(new_listings, search_params, user_id)
+                craigslist.save_results(results)
+                fanned_out.append((user_id, search_params, results))
+        return fanned_out
+
+    def advance_watermark(self):
+        """Record the last run's newest posting as processed; call once its results have been delivered"""
+        if self._newest is not None:
+            get_seen_store().set_watermark(self.url, self._newest)
+            self._newest = None
+
+    def __str__(self):
+        return f"{self.key} ({len(self.subscribers)} subscriber(s))"
+
+def plan_queries(filters_by_user, incremental=True):
+    """Groups every user's filters into distinct queries, each scraped once per sweep.
+
+    Incremental plans stop parsing at each query's high-water mark; pass
+    incremental=False for a full scrape (e.g. a user's first search).
+    """
+    plans = {}
+    for user_id, filters in filters_by_user.items():
+        for search_params in filters:
+            try:
+                key = query_key(search_params)
+            except UnknownLocationError as e:
+                logger.warning(f"Skipping filter {search_params} for user {user_id}: {e}")
+                continue
+            if key not in plans:
+                plans[key] = QueryPlan(key, search_params, incremental)
+            plans[key].add_subscriber(user_id, search_params)
+
+    subscriptions = sum(len(plan.subscribers) for plan in plans.values())
+    logger.info(f"Planned {len(plans)} distinct queries for {subscriptions} filters")
+    return list(plans.values())
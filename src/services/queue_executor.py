@@ -0,0 +1,137 @@
+# services/queue_executor.py
+import logging
+import queue
+import threading
+import time
+
+from constants.constants import JOB_POLL_SECONDS, JOB_MAX_WAIT
+from services.job_queue import JobQueue, DONE
+from scrapers.circuit_breaker import CircuitOpenError, host_breaker
+from scrapers.craigslist import SCRAPE_FAILURES, record_scrape_failure
+from services.query_planner import QUERY_SECONDS
+from services.search_executor import SEARCH_JOBS
+
+logger = logging.getLogger(__name__)
+
+class QueueSearchExecutor:
+    """Runs searches on scrape worker processes (python -m scrapers.worker) through the job queue
+
+    Each QueryPlan is enqueued as its URL and high-water mark. A worker
+    fetches and parses the page, and the listings come back to be matched,
+    deduplicated and saved here by `plan.fan_out`. The interface is the same
+    as SearchExecutor's; `submit` callbacks run on the collector thread.
+
+    The subdomain circuit breakers stay in this process: a plan whose
+    subdomain is cooling down is not enqueued, and each finished job's
+    outcome is recorded against its breaker, so the poll scheduler backs off
+    exactly as it does with local scraping. The queue limits how many jobs
+    per subdomain run at once (SEARCH_PER_HOST_LIMIT).
+    """
+
+    def __init__(self, job_queue=None, poll_seconds=JOB_POLL_SECONDS, max_wait=JOB_MAX_WAIT):
+        self.job_queue = job_queue or JobQueue()
+        self.poll_seconds = poll_seconds
+        self.max_wait = max_wait
+        # Results of a previous bot process have nobody waiting on them
+        dropped = self.job_queue.purge()
+        if dropped:
+            logger.info(f"Dropped {dropped} jobs left in the queue by a previous run")
+        self._pending = {}  # job ID -> (plan, callback, enqueued at)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        threading.Thread(target=self._collect_loop, name="job-collector", daemon=True).start()
+
+    def _enqueue(self, plan, callback):
+        """Queue one plan; `callback(plan, listings, error)` is called from the collector thread when it finishes,
+        or right away if the plan's subdomain is cooling down"""
+        url = plan.url
+        breaker = host_breaker(url)
+        if not breaker.allow():
+            SCRAPE_FAILURES.inc(host=breaker.host, reason="circuit_open")
+            callback(plan, None, CircuitOpenError(f"{breaker.host} is cooling down for another {breaker.retry_in():.0f}s"))
+            return
+        payload = {"url": url, "stop_at": plan.stop_at()}
+        with self._lock:
+            job_id = self.job_queue.enqueue(payload, plan.host)
+            self._pending[job_id] = (plan, callback, time.monotonic())
+        SEARCH_JOBS.inc()
+        logger.info(f"Queued job {job_id} for {plan}")
+
+    def _collect_loop(self):
+        while not self._stopped.wait(self.poll_seconds):
+            try:
+                self._collect()
+            except Exception as e:
+                logger.error(f"Error collecting finished jobs: {e}", exc_info=True)
+
+    def _collect(self):
+        with self._lock:
+            job_ids = set(self._pending)
+        if not job_ids:
+            return
+
+        finished = []
+        for job in self.job_queue.collect(job_ids):
+            breaker = host_breaker(job.payload["url"])
+            if job.status == DONE:
+                breaker.record_success()
+                finished.append((job.id, job.result["listings"], None))
+            else:
+                record_scrape_failure(breaker, bool(job.result and job.result.get("blocked")))
+                finished.append((job.id, None, job.error))
+        # Jobs no worker has picked up in time are withdrawn, so their queries can be scheduled again
+        now = time.monotonic()
+        with self._lock:
+            overdue = [(job_id, plan) for job_id, (plan, _, enqueued_at) in self._pending.items()
+                       if now - enqueued_at > self.max_wait]
+        for job_id, plan in overdue:
+            if self.job_queue.cancel(job_id):
+                host_breaker(plan.url).cancel_probe()  # Never sent, so it says nothing about the subdomain
+                finished.append((job_id, None, f"no scrape worker picked it up within {self.max_wait}s"))
+
+        for job_id, listings, error in finished:
+            with self._lock:
+                entry = self._pending.pop(job_id, None)
+            if entry is None:
+                continue
+            plan, callback, enqueued_at = entry
+            SEARCH_JOBS.dec()
+            QUERY_SECONDS.observe(time.monotonic() - enqueued_at)
+            callback(plan, listings, error)
+
+    def _finish(self, plan, listings, error, on_result):
+        if error is not None:
+            logger.error(f"Search failed for {plan}: {error}")
+            return
+        try:
+            fanned_out = plan.fan_out(listings)
+        except Exception as e:
+            logger.error(f"Error matching results for {plan}: {e}", exc_info=True)
+            return
+        try:
+            on_result(plan, fanned_out)
+        except Exception as e:
+            logger.error(f"Error handling results for {plan}: {e}", exc_info=True)
+
+    def run(self, jobs, on_result):
+        """Queue all plans and call `on_result(plan, results)` on the calling thread as each one finishes."""
+        finished = queue.Queue()
+        jobs = list(jobs)
+        for plan in jobs:
+            self._enqueue(plan, lambda plan, listings, error: finished.put((plan, listings, error)))
+        for _ in jobs:
+            plan, listings, error = finished.get()
+            self._finish(plan, listings, error, on_result)
+
+    def submit(self, job, on_result, on_done=None):
+        """Queue one plan and call `on_result(plan, results)` when it succeeds and `on_done(plan)` after every run."""
+        def callback(plan, listings, error):
+            try:
+                self._finish(plan, listings, error, on_result)
+            finally:
+                if on_done:
+                    on_done(plan)
+        self._enqueue(job, callback)
+
+    def shutdown(self):
+        self._stopped.set()
@@ -0,0 +1,96 @@
+# services/results_sink.py
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from constants.constants import RESULTS_LOG_FILE, RESULTS_FILE, RESULTS_MAX_AGE_DAYS
+from storage.base import BaseResultStore
+
+logger = logging.getLogger(__name__)
+
+class ResultsSink(BaseResultStore):
+    """Append-only newline-delimited JSON log of every result delivered to users"""
+
+    def __init__(self, log_file=RESULTS_LOG_FILE):
+        self.log_file = log_file
+        self._lock = threading.Lock()
+
+    def write(self, results):
+        """Append a batch of results with a single write, stamping each with `found_at`"""
+        if not results:
+            return
+        now = time.time()
+        lines = "".join(json.dumps(dict(result, found_at=now), ensure_ascii=False) + "\n" for result in results)
+        data = lines.encode("utf-8")
+        with self._lock:
+            fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+
+    def _read(self):
+        """Yield every record in the log, skipping lines that can't be parsed"""
+        if not os.path.exists(self.log_file):
+            return
+        with open(self.log_file, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def recent(self, user_id=None, search_item=None, search_location=None, limit=20):
+        """Most recent results, newest last, optionally for one user and/or one filter"""
+        matches = deque(maxlen=limit)
+        for record in self._read():
+            if user_id is not None and record.get("user_id") != user_id:
+                continue
+            if search_item is not None and record.get("search_item") != search_item:
+                continue
+            if search_location is not None and record.get("search_location") != search_location:
+                continue
+            matches.append(record)
+        return list(matches)
+
+    def compact(self, max_age_days=RESULTS_MAX_AGE_DAYS):
+        """Rewrite the log without records older than `max_age_days`, replacing it atomically"""
+        cutoff = time.time() - max_age_days * 86400
+        tmp_file = self.log_file + ".tmp"
+        with self._lock:
+            kept = dropped = 0
+            with open(tmp_file, "w", encoding="utf-8") as out:
+                for record in self._read():
+                    if record.get("found_at", 0) < cutoff:
+                        dropped += 1
+                        continue
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    kept += 1
+            os.replace(tmp_file, self.log_file)
+        logger.info(f"Compacted results log: kept {kept}, dropped {dropped} older than {max_age_days} days")
+
+def import_results_file(sink, results_file=RESULTS_FILE):
+    """One-off import of the old results.json array into the log"""
+    try:
+        with open(results_file, "r") as file:
+            results = json.load(file)
+    except (OSError, json.JSONDecodeError, ValueError):
+        return
+    sink.write(results)
+    logger.info(f"Imported {len(results)} results from {results_file}")
+
+_sink = None
+_sink_lock = threading.Lock()
+
+def get_results_sink():
+    """Returns the process-wide results store for the configured storage backend."""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            # Imported here: the backends module imports this one
+            from storage.backends import create_result_store
+            _sink = create_result_store()
+        return _sink
@@ -0,0 +1,119 @@
+# services/search_executor.py
+import logging
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from constants.constants import SEARCH_MAX_WORKERS, SEARCH_PER_HOST_LIMIT, SEARCH_EXECUTION, RUNTIME
+from metrics.registry import gauge
+
+logger = logging.getLogger(__name__)
+
+SEARCH_JOBS = gauge("search_jobs", "Searches queued or running on the executor")
+
+class SearchExecutor:
+    """Runs searches on a bounded worker pool with a global and a per-subdomain concurrency limit
+
+    A job is any object with a `host` attribute and a `run()` method, such as a QueryPlan.
+    Jobs wait in a queue per subdomain and are only handed to the pool while
+    their subdomain has a free slot, so a busy subdomain never ties up
+    threads that other subdomains could use.
+    """
+
+    def __init__(self, max_workers=SEARCH_MAX_WORKERS, per_host_limit=SEARCH_PER_HOST_LIMIT):
+        self.per_host_limit = per_host_limit
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search")
+        self._running = {}  # host -> jobs on the pool
+        self._waiting = {}  # host -> deque of tasks waiting for a slot
+        self._lock = threading.Lock()
+
+    def _dispatch(self, host, task):
+        """Start `task` now if the host has a free slot, otherwise queue it behind the host's other jobs"""
+        with self._lock:
+            if self._running.get(host, 0) >= self.per_host_limit:
+                self._waiting.setdefault(host, deque()).append(task)
+                return
+            self._running[host] = self._running.get(host, 0) + 1
+        self._pool.submit(self._run_task, host, task)
+
+    def _run_task(self, host, task):
+        try:
+            task()
+        finally:
+            # Hand the slot straight to the host's next waiting job, if any
+            with self._lock:
+                waiting = self._waiting.get(host)
+                next_task = waiting.popleft() if waiting else None
+                if waiting is not None and not waiting:
+                    del self._waiting[host]
+                if next_task is None:
+                    self._running[host] -= 1
+                    if not self._running[host]:
+                        del self._running[host]
+            if next_task is not None:
+                self._pool.submit(self._run_task, host, next_task)
+
+    def _start(self, job, done):
+        """Run the job once its host has a free slot, then call `done(job, results, error)` from the worker"""
+        SEARCH_JOBS.inc()
+
+        def task():
+            try:
+                results, error = job.run(), None
+            except Exception as e:
+                results, error = None, e
+            SEARCH_JOBS.dec()
+            done(job, results, error)
+        self._dispatch(job.host, task)
+
+    def run(self, jobs, on_result):
+        """Run all jobs concurrently and call `on_result(job, results)` as each one finishes.
+
+        Callbacks run on the calling thread, one at a time, in completion order.
+        """
+        finished = queue.Queue()
+        jobs = list(jobs)
+        for job in jobs:
+            self._start(job, lambda job, results, error: finished.put((job, results, error)))
+        for _ in jobs:
+            job, results, error = finished.get()
+            if error is not None:
+                logger.error(f"Search failed for {job}: {error}", exc_info=error)
+                continue
+            try:
+                on_result(job, results)
+            except Exception as e:
+                logger.error(f"Error handling results for {job}: {e}", exc_info=True)
+
+    def submit(self, job, on_result, on_done=None):
+        """Run one job in the background and call `on_result(job, results)` from the worker when it succeeds.
+
+        `on_done(job)` is called after every run, whether or not it succeeded.
+        """
+        def done(job, results, error):
+            try:
+                if error is not None:
+                    logger.error(f"Search failed for {job}: {error}", exc_info=error)
+                else:
+                    on_result(job, results)
+            except Exception as e:
+                logger.error(f"Error handling results for {job}: {e}", exc_info=True)
+            finally:
+                if on_done:
+                    on_done(job)
+        self._start(job, done)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+def create_search_executor(execution=SEARCH_EXECUTION, runtime=RUNTIME):
+    """Creates the executor for the configured SEARCH_EXECUTION: local threads, or worker processes via the job queue.
+
+    The asyncio runtime scrapes on its own event loop, so it always gets the local executor.
+    """
+    if execution == "queue" and runtime != "asyncio":
+        # Imported here: the queue executor imports this module
+        from services.queue_executor import QueueSearchExecutor
+        return QueueSearchExecutor()
+    return SearchExecutor()
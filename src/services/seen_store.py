@@ -0,0 +1,163 @@
+# services/seen_store.py
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from constants.constants import SEEN_DB_FILE, SEEN_TTL_DAYS, LINKS_FILE, FILTERS_FILE
+from services.filter_service import FilterService
+from storage.base import BaseSeenStore
+
+logger = logging.getLogger(__name__)
+
+POSTING_ID_PATTERN = re.compile(r"/(\d+)\.html")
+EXPIRE_EVERY = 3600  # Seconds between TTL sweeps
+
+def posting_id(link):
+    """Extracts the Craigslist posting ID from a listing link, falling back to the link itself"""
+    match = POSTING_ID_PATTERN.search(link)
+    return match.group(1) if match else link
+
+class SeenStore(BaseSeenStore):
+    """Per-user record of listings already delivered, persisted in SQLite with an in-memory index"""
+
+    def __init__(self, db_file=SEEN_DB_FILE, ttl_days=SEEN_TTL_DAYS):
+        self.ttl = ttl_days * 86400
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            "user_id TEXT NOT NULL, posting_id TEXT NOT NULL, seen_at REAL NOT NULL, "
+            "PRIMARY KEY (user_id, posting_id)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS seen_at_idx ON seen (seen_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks ("
+            "query_key TEXT PRIMARY KEY, posting_number INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._last_expired = 0
+        self._index = {}  # user_id -> {posting_id: seen_at}
+        self._load()
+
+    def _load(self):
+        """Expire old entries and load the rest into memory, once"""
+        self.expire()
+        for user_id, pid, seen_at in self._conn.execute("SELECT user_id, posting_id, seen_at FROM seen"):
+            self._index.setdefault(user_id, {})[pid] = seen_at
+        logger.info(f"Loaded {sum(len(ids) for ids in self._index.values())} seen listings")
+
+    def is_empty(self):
+        return not self._index
+
+    def claim(self, user_id, listings):
+        """Returns the listings this user hasn't seen yet and marks them as seen in one bulk write"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_expired > EXPIRE_EVERY:
+                self._expire(now)
+
+            seen = self._index.setdefault(user_id, {})
+            new_listings = []
+            rows = []
+            for listing in listings:
+                pid = posting_id(listing['link'])
+                if pid in seen:
+                    continue
+                seen[pid] = now
+                new_listings.append(listing)
+                rows.append((user_id, pid, now))
+
+            if rows:
+                self._conn.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?, ?)", rows)
+                self._conn.commit()
+        return new_listings
+
+    def mark_seen(self, user_id, posting_ids, seen_at=None):
+        """Bulk-insert posting IDs for a user"""
+        seen_at = seen_at or time.time()
+        with self._lock:
+            seen = self._index.setdefault(user_id, {})
+            rows = [(user_id, pid, seen_at) for pid in posting_ids if pid not in seen]
+            for _, pid, _ in rows:
+                seen[pid] = seen_at
+            self._conn.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def entries(self):
+        """Every (user_id, posting_id, seen_at) row still within the TTL"""
+        with self._lock:
+            return [(user_id, pid, seen_at) for user_id, ids in self._index.items() for pid, seen_at in ids.items()]
+
+    def import_entries(self, rows):
+        """Bulk-insert (user_id, posting_id, seen_at) rows, keeping their timestamps"""
+        with self._lock:
+            for user_id, pid, seen_at in rows:
+                self._index.setdefault(user_id, {}).setdefault(pid, seen_at)
+            self._conn.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def get_watermark(self, query_key):
+        """Newest posting ID already processed for a query, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT posting_number FROM watermarks WHERE query_key = ?", (query_key,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, query_key, posting_number):
+        """Raise a query's high-water mark (it never moves backwards)"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO watermarks VALUES (?, ?, ?) ON CONFLICT(query_key) DO UPDATE SET "
+                "posting_number = MAX(posting_number, excluded.posting_number), updated_at = excluded.updated_at",
+                (query_key, posting_number, time.time()))
+            self._conn.commit()
+
+    def expire(self):
+        """Drop entries older than the TTL"""
+        with self._lock:
+            self._expire(time.time())
+
+    def _expire(self, now):
+        cutoff = now - self.ttl
+        deleted = self._conn.execute("DELETE FROM seen WHERE seen_at < ?", (cutoff,)).rowcount
+        self._conn.execute("DELETE FROM watermarks WHERE updated_at < ?", (cutoff,))
+        self._conn.commit()
+        for user_id in list(self._index):
+            ids = self._index[user_id]
+            for pid in [pid for pid, seen_at in ids.items() if seen_at < cutoff]:
+                del ids[pid]
+            if not ids:
+                del self._index[user_id]
+        self._last_expired = now
+        if deleted:
+            logger.info(f"Expired {deleted} seen listings older than {self.ttl // 86400} days")
+
+def import_links_file(store, links_file=LINKS_FILE, filters_file=FILTERS_FILE):
+    """One-off import of the old global scraped_links.txt, marking each link as seen for every current user"""
+    if not os.path.exists(links_file):
+        return
+    with open(links_file, 'r') as file:
+        posting_ids = [posting_id(line.strip()) for line in file if line.strip()]
+    user_ids = FilterService(filters_file).get_all_users()
+
+    for user_id in user_ids:
+        store.mark_seen(user_id, posting_ids)
+    logger.info(f"Imported {len(posting_ids)} links from {links_file} for {len(user_ids)} users")
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_seen_store():
+    """Returns the process-wide seen-listings store for the configured storage backend."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            # Imported here: the backends module imports this one
+            from storage.backends import create_seen_store
+            _store = create_seen_store()
+        return _store
\ No newline at end of file
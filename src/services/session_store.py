@@ -0,0 +1,172 @@
+# services/session_store.py
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from constants.constants import SESSION_DB_FILE, SESSION_TTL_HOURS, SESSION_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+EXPIRE_EVERY = 3600  # Seconds between TTL sweeps of the database
+
+class SessionStore:
+    """Per-chat conversation state (the /add, /edit and /delete flows), bounded in memory and persisted in SQLite
+
+    Used like a dict keyed by chat ID. Every assignment, deletion and
+    `save()` is written through to the database, so a restarted bot picks up
+    conversations where they left off. At most `max_entries` sessions are
+    kept in memory, least recently used first out; an evicted session is
+    reloaded from disk on its chat's next message. Sessions idle for longer
+    than the TTL are dropped from both.
+
+    Handlers mutate the session dict they get back, so they call
+    `save(chat_id)` once they are done with it. Until then the handed-out
+    dict is kept even if the LRU evicts it, so later lookups return the same
+    object and `save` still writes the handler's changes. The `state` value
+    is stored by its `.value` and restored as a `state_enum` member.
+    """
+
+    def __init__(self, db_file=SESSION_DB_FILE, state_enum=None, ttl_hours=SESSION_TTL_HOURS,
+                 max_entries=SESSION_MAX_ENTRIES):
+        self.state_enum = state_enum
+        self.ttl = ttl_hours * 3600
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # chat ID -> (session, last used), least recently used first
+        self._checked_out = {}  # chat ID -> session handed out and not yet saved, evicted or not
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "chat_id TEXT PRIMARY KEY, record TEXT NOT NULL, updated_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.commit()
+        self._last_expired = 0
+
+    def _encode(self, session):
+        record = dict(session)
+        if "state" in record and hasattr(record["state"], "value"):
+            record["state"] = record["state"].value
+        return json.dumps(record, separators=(",", ":"))
+
+    def _decode(self, record):
+        session = json.loads(record)
+        if self.state_enum is not None and session.get("state") is not None:
+            session["state"] = self.state_enum(session["state"])
+        return session
+
+    def _load(self, chat_id, now):
+        """The chat's session from memory or disk, or None; caller holds the lock"""
+        entry = self._sessions.get(chat_id)
+        if entry is not None:
+            session, used_at = entry
+            if now - used_at <= self.ttl:
+                self._sessions[chat_id] = (session, now)
+                self._sessions.move_to_end(chat_id)
+                return session
+            self._drop(chat_id)
+            return None
+
+        session = self._checked_out.get(chat_id)
+        if session is not None:
+            # Evicted while a handler still holds it; the copy on disk is missing its changes
+            self._remember(chat_id, session, now)
+            return session
+        row = self._conn.execute(
+            "SELECT record, updated_at FROM sessions WHERE chat_id = ?", (str(chat_id),)).fetchone()
+        if row is None:
+            return None
+        if now - row[1] > self.ttl:
+            self._drop(chat_id)
+            return None
+        session = self._decode(row[0])
+        self._remember(chat_id, session, now)
+        return session
+
+    def _remember(self, chat_id, session, now):
+        self._sessions[chat_id] = (session, now)
+        self._sessions.move_to_end(chat_id)
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)  # Still on disk until it expires
+
+    def _write(self, chat_id, session, now):
+        self._conn.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (str(chat_id), self._encode(session), now))
+        if now - self._last_expired > EXPIRE_EVERY:
+            self._expire(now)
+        self._conn.commit()
+
+    def _drop(self, chat_id):
+        self._sessions.pop(chat_id, None)
+        self._checked_out.pop(chat_id, None)
+        self._conn.execute("DELETE FROM sessions WHERE chat_id = ?", (str(chat_id),))
+        self._conn.commit()
+
+    def __contains__(self, chat_id):
+        with self._lock:
+            return self._load(chat_id, time.time()) is not None
+
+    def _check_out(self, chat_id):
+        session = self._load(chat_id, time.time())
+        if session is not None:
+            self._checked_out[chat_id] = session
+        return session
+
+    def __getitem__(self, chat_id):
+        with self._lock:
+            session = self._check_out(chat_id)
+        if session is None:
+            raise KeyError(chat_id)
+        return session
+
+    def get(self, chat_id, default=None):
+        with self._lock:
+            session = self._check_out(chat_id)
+        return default if session is None else session
+
+    def __setitem__(self, chat_id, session):
+        now = time.time()
+        with self._lock:
+            self._checked_out.pop(chat_id, None)
+            self._remember(chat_id, session, now)
+            self._write(chat_id, session, now)
+
+    def __delitem__(self, chat_id):
+        with self._lock:
+            self._drop(chat_id)
+
+    def __len__(self):
+        """Sessions currently held in memory"""
+        with self._lock:
+            return len(self._sessions)
+
+    def save(self, chat_id):
+        """Write a session changed in place back to disk; does nothing if the chat has no session"""
+        now = time.time()
+        with self._lock:
+            session = self._checked_out.pop(chat_id, None)
+            if session is None:
+                entry = self._sessions.get(chat_id)
+                if entry is None:
+                    return
+                session = entry[0]
+            self._remember(chat_id, session, now)
+            self._write(chat_id, session, now)
+
+    def expire(self):
+        """Drop sessions idle for longer than the TTL"""
+        with self._lock:
+            self._expire(time.time())
+            self._conn.commit()
+
+    def _expire(self, now):
+        cutoff = now - self.ttl
+        deleted = self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+        for chat_id in [chat_id for chat_id, (_, used_at) in self._sessions.items() if used_at < cutoff]:
+            del self._sessions[chat_id]
+        self._last_expired = now
+        if deleted:
+            logger.info(f"Expired {deleted} abandoned sessions")
@@ -0,0 +1,45 @@
+# services/settings_service.py
+import json
+import os
+import tempfile
+import threading
+
+class SettingsService:
+    """Per-user preferences (e.g. digest interval), kept in memory and written through to a JSON file"""
+
+    def __init__(self, settings_file):
+        self.settings_file = settings_file
+        self._lock = threading.Lock()
+        self._settings = self._read_file()
+
+    def _read_file(self):
+        try:
+            if os.path.exists(self.settings_file):
+                with open(self.settings_file, "r") as file:
+                    return json.load(file)
+            return {}
+        except json.JSONDecodeError:
+            return {}
+
+    def _write_file(self):
+        directory = os.path.dirname(os.path.abspath(self.settings_file))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".settings-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(self._settings, file, indent=4)
+            os.replace(tmp_path, self.settings_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, user_id, key, default=None):
+        """Get one setting for a user"""
+        with self._lock:
+            return self._settings.get(str(user_id), {}).get(key, default)
+
+    def set(self, user_id, key, value):
+        """Set one setting for a user and persist it"""
+        with self._lock:
+            self._settings.setdefault(str(user_id), {})[key] = value
+            self._write_file()
\ No newline at end of file
@@ -0,0 +1,50 @@
+import logging
+import os
+
+from constants.constants import STORAGE_BACKEND, STORAGE_DB_FILE, FILTERS_FILE, SEEN_DB_FILE, RESULTS_LOG_FILE, SESSION_DB_FILE
+from services.filter_service import FilterService
+from services.seen_store import SeenStore, import_links_file
+from services.results_sink import ResultsSink, import_results_file
+from services.session_store import SessionStore
+from services.digest_store import DigestStore
+from storage.sqlite_store import SQLiteFilterStore, SQLiteResultStore
+
+logger = logging.getLogger(__name__)
+
+# STORAGE_BACKEND values:
+#   "files"  - filters.json, seen.db (with pending digests), results.ndjson and sessions.db under resources/
+#   "sqlite" - one WAL-mode database (STORAGE_DB_FILE) holding filters, seen listings, pending digests,
+#              results and sessions; populate it from the flat files with `python -m storage.migrate`
+
+def create_filter_store(backend=STORAGE_BACKEND):
+    """Creates the filter store for the configured backend."""
+    if backend == "sqlite":
+        return SQLiteFilterStore(STORAGE_DB_FILE)
+    return FilterService(FILTERS_FILE)
+
+def create_seen_store(backend=STORAGE_BACKEND):
+    """Creates the seen-listings store for the configured backend."""
+    if backend == "sqlite":
+        return SeenStore(STORAGE_DB_FILE)
+    store = SeenStore(SEEN_DB_FILE)
+    if store.is_empty():
+        import_links_file(store)
+    return store
+
+def create_result_store(backend=STORAGE_BACKEND):
+    """Creates the results store for the configured backend."""
+    if backend == "sqlite":
+        return SQLiteResultStore(STORAGE_DB_FILE)
+    is_new = not os.path.exists(RESULTS_LOG_FILE)
+    sink = ResultsSink(RESULTS_LOG_FILE)
+    if is_new:
+        import_results_file(sink)
+    return sink
+
+def create_session_store(state_enum=None, backend=STORAGE_BACKEND):
+    """Creates the conversation session store for the configured backend."""
+    return SessionStore(STORAGE_DB_FILE if backend == "sqlite" else SESSION_DB_FILE, state_enum)
+
+def create_digest_store(backend=STORAGE_BACKEND):
+    """Creates the store of listings waiting for a scheduled digest, in the seen-listings database."""
+    return DigestStore(STORAGE_DB_FILE if backend == "sqlite" else SEEN_DB_FILE)
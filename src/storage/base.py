@@ -0,0 +1,80 @@
+from abc import ABC, abstractmethod
+
+class BaseFilterStore(ABC):
+    """Abstract base class for per-user filter storage"""
+    
+    @abstractmethod
+    def get_user_filters(self, user_id):
+        """Get all filters for a specific user"""
+        pass
+    
+    @abstractmethod
+    def add_filter(self, user_id, filter_data):
+        """Add a new filter for a user"""
+        pass
+    
+    @abstractmethod
+    def update_filter(self, user_id, filter_index, filter_data):
+        """Update an existing filter, returning False if it doesn't exist"""
+        pass
+    
+    @abstractmethod
+    def delete_filter(self, user_id, filter_index):
+        """Delete a filter, returning False if it doesn't exist"""
+        pass
+    
+    @abstractmethod
+    def get_all_users(self):
+        """List the IDs of every user with filters"""
+        pass
+
+class BaseSeenStore(ABC):
+    """Abstract base class for the per-user record of listings already delivered"""
+    
+    @abstractmethod
+    def claim(self, user_id, listings):
+        """Return the listings this user hasn't seen yet and mark them as seen"""
+        pass
+    
+    @abstractmethod
+    def mark_seen(self, user_id, posting_ids, seen_at=None):
+        """Bulk-insert posting IDs for a user"""
+        pass
+    
+    @abstractmethod
+    def expire(self):
+        """Drop entries older than the TTL"""
+        pass
+    
+    @abstractmethod
+    def get_watermark(self, query_key):
+        """Newest posting ID already processed for a query, or None"""
+        pass
+    
+    @abstractmethod
+    def set_watermark(self, query_key, posting_number):
+        """Record the newest posting ID processed for a query"""
+        pass
+    
+    @abstractmethod
+    def is_empty(self):
+        """True if nothing has been recorded yet"""
+        pass
+
+class BaseResultStore(ABC):
+    """Abstract base class for the history of results delivered to users"""
+    
+    @abstractmethod
+    def write(self, results):
+        """Append a batch of results"""
+        pass
+    
+    @abstractmethod
+    def recent(self, user_id=None, search_item=None, search_location=None, limit=20):
+        """Most recent results, newest last, optionally for one user and/or one filter"""
+        pass
+    
+    @abstractmethod
+    def compact(self, max_age_days):
+        """Drop results older than `max_age_days`"""
+        pass
@@ -0,0 +1,60 @@
+"""Imports the flat files under resources/ into the SQLite storage backend.
+
+Run from src/:  python -m storage.migrate [--db PATH]
+"""
+import argparse
+import logging
+import os
+
+from constants.constants import STORAGE_DB_FILE, FILTERS_FILE, LINKS_FILE, SEEN_DB_FILE, RESULTS_FILE, RESULTS_LOG_FILE
+from services.filter_service import FilterService
+from services.seen_store import SeenStore, import_links_file
+from services.results_sink import ResultsSink, import_results_file
+from storage.sqlite_store import SQLiteFilterStore, SQLiteResultStore
+
+logger = logging.getLogger(__name__)
+
+def migrate_filters(db_file):
+    filters_data = FilterService(FILTERS_FILE).load_filters()
+    store = SQLiteFilterStore(db_file)
+    if store.get_all_users():
+        logger.warning("Filters table is not empty, skipping filters")
+        return
+    for user_id, filters in filters_data.items():
+        store.add_filters(user_id, filters)
+    logger.info(f"Migrated filters for {len(filters_data)} users")
+
+def migrate_seen(db_file):
+    store = SeenStore(db_file)
+    if os.path.exists(SEEN_DB_FILE) and os.path.abspath(SEEN_DB_FILE) != os.path.abspath(db_file):
+        # Copy the per-user entries recorded by the files backend
+        rows = SeenStore(SEEN_DB_FILE).entries()
+        store.import_entries(rows)
+        logger.info(f"Migrated {len(rows)} seen listings from {SEEN_DB_FILE}")
+    import_links_file(store, LINKS_FILE, FILTERS_FILE)
+
+def migrate_results(db_file):
+    store = SQLiteResultStore(db_file)
+    if store.recent(limit=1):
+        logger.warning("Results table is not empty, skipping results")
+        return
+    if os.path.exists(RESULTS_LOG_FILE):
+        records = ResultsSink(RESULTS_LOG_FILE).recent(limit=None)
+        store.write(records)
+        logger.info(f"Migrated {len(records)} results from {RESULTS_LOG_FILE}")
+    else:
+        import_results_file(store, RESULTS_FILE)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=STORAGE_DB_FILE, help="SQLite database to import into")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    migrate_filters(args.db)
+    migrate_seen(args.db)
+    migrate_results(args.db)
+    logger.info(f"Migration into {args.db} complete; set STORAGE_BACKEND=sqlite to use it")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from constants.constants import STORAGE_DB_FILE, RESULTS_MAX_AGE_DAYS
+from storage.base import BaseFilterStore, BaseResultStore
+from services.seen_store import posting_id
+from services.filter_service import normalize_filter
+
+logger = logging.getLogger(__name__)
+
+def connect(db_file):
+    """Opens a SQLite connection in WAL mode, shareable across threads (callers hold their own lock)."""
+    conn = sqlite3.connect(db_file, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def filter_query_key(filter_data):
+    """Location plus normalized item; filters sharing it are the same Craigslist search"""
+    item = " ".join(str(filter_data.get("item", "")).lower().split())
+    return f"{filter_data.get('location', '')}|{item}"
+
+class SQLiteFilterStore(BaseFilterStore):
+    """Filters stored one row per filter, indexed by user and query key"""
+
+    def __init__(self, db_file=STORAGE_DB_FILE):
+        self._lock = threading.Lock()
+        self._conn = connect(db_file)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS filters ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " user_id TEXT NOT NULL,"
+            " query_key TEXT NOT NULL,"
+            " data TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS filters_user_idx ON filters (user_id, id);"
+            "CREATE INDEX IF NOT EXISTS filters_query_idx ON filters (query_key);"
+        )
+        self._conn.commit()
+
+    def _row_ids(self, user_id):
+        return [row[0] for row in self._conn.execute(
+            "SELECT id FROM filters WHERE user_id = ? ORDER BY id", (user_id,))]
+
+    def get_user_filters(self, user_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM filters WHERE user_id = ? ORDER BY id", (user_id,)).fetchall()
+        return [normalize_filter(json.loads(data)) for (data,) in rows]
+
+    def add_filter(self, user_id, filter_data):
+        filter_data = normalize_filter(filter_data)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO filters (user_id, query_key, data) VALUES (?, ?, ?)",
+                (user_id, filter_query_key(filter_data), json.dumps(filter_data)))
+            self._conn.commit()
+        return True
+
+    def add_filters(self, user_id, filters):
+        """Bulk-insert filters for a user, keeping their order"""
+        filters = [normalize_filter(f) for f in filters]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO filters (user_id, query_key, data) VALUES (?, ?, ?)",
+                [(user_id, filter_query_key(f), json.dumps(f)) for f in filters])
+            self._conn.commit()
+
+    def update_filter(self, user_id, filter_index, filter_data):
+        filter_data = normalize_filter(filter_data)
+        with self._lock:
+            ids = self._row_ids(user_id)
+            if not 0 <= filter_index < len(ids):
+                return False
+            self._conn.execute(
+                "UPDATE filters SET query_key = ?, data = ? WHERE id = ?",
+                (filter_query_key(filter_data), json.dumps(filter_data), ids[filter_index]))
+            self._conn.commit()
+        return True
+
+    def delete_filter(self, user_id, filter_index):
+        with self._lock:
+            ids = self._row_ids(user_id)
+            if not 0 <= filter_index < len(ids):
+                return False
+            self._conn.execute("DELETE FROM filters WHERE id = ?", (ids[filter_index],))
+            self._conn.commit()
+        return True
+
+    def get_all_users(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT user_id FROM filters")]
+
+    def load_filters(self):
+        """All filters as {user_id: [filter, ...]}, the same shape as filters.json"""
+        filters_data = {}
+        with self._lock:
+            rows = self._conn.execute("SELECT user_id, data FROM filters ORDER BY id").fetchall()
+        for user_id, data in rows:
+            filters_data.setdefault(user_id, []).append(normalize_filter(json.loads(data)))
+        return filters_data
+
+class SQLiteResultStore(BaseResultStore):
+    """Result history in SQLite, indexed by user, query key and posting ID"""
+
+    def __init__(self, db_file=STORAGE_DB_FILE):
+        self._lock = threading.Lock()
+        self._conn = connect(db_file)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " user_id TEXT,"
+            " query_key TEXT NOT NULL,"
+            " posting_id TEXT,"
+            " found_at REAL NOT NULL,"
+            " data TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS results_user_idx ON results (user_id, found_at);"
+            "CREATE INDEX IF NOT EXISTS results_query_idx ON results (query_key, found_at);"
+            "CREATE INDEX IF NOT EXISTS results_posting_idx ON results (posting_id);"
+            "CREATE INDEX IF NOT EXISTS results_found_idx ON results (found_at);"
+        )
+        self._conn.commit()
+
+    def write(self, results):
+        if not results:
+            return
+        now = time.time()
+        rows = []
+        for result in results:
+            record = dict(result)
+            record.setdefault("found_at", now)
+            query_key = filter_query_key({"item": record.get("search_item", ""), "location": record.get("search_location", "")})
+            rows.append((record.get("user_id"), query_key, posting_id(record.get("link", "")),
+                         record["found_at"], json.dumps(record, ensure_ascii=False)))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO results (user_id, query_key, posting_id, found_at, data) VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def recent(self, user_id=None, search_item=None, search_location=None, limit=20):
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if search_item is not None and search_location is not None:
+            clauses.append("query_key = ?")
+            params.append(filter_query_key({"item": search_item, "location": search_location}))
+        elif search_item is not None:
+            clauses.append("json_extract(data, '$.search_item') = ?")
+            params.append(search_item)
+        elif search_location is not None:
+            clauses.append("json_extract(data, '$.search_location') = ?")
+            params.append(search_location)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT data FROM results {where} ORDER BY found_at DESC, id DESC LIMIT ?",
+                (*params, limit)).fetchall()
+        return [json.loads(data) for (data,) in reversed(rows)]
+
+    def compact(self, max_age_days=RESULTS_MAX_AGE_DAYS):
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM results WHERE found_at < ?", (cutoff,)).rowcount
+            self._conn.commit()
+        logger.info(f"Compacted results table: dropped {deleted} older than {max_age_days} days")